@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import yfinance as yf
 from datetime import timedelta
 
+from data.price_cache import load_close_series
+
 SIGNALS_CSV = "signals_log.csv"
 
 
@@ -27,24 +28,14 @@ def main():
     # pegamos uns dias a mais no final para garantir o próximo candle
     end_date = df["date"].max() + timedelta(days=10)
 
-    print(f"\nBaixando histórico de {ticker_y} de {start_date.date()} até {end_date.date()}...")
-    data_y = yf.download(ticker_y, start=start_date, end=end_date)
+    print(f"\nCarregando histórico de {ticker_y} de {start_date.date()} até {end_date.date()}...")
+    price_map = load_close_series(ticker_y, start=start_date)
+    price_map = price_map[price_map.index < end_date]
 
-    if data_y.empty:
+    if price_map.empty:
         print("Falha ao baixar dados de Y para análise de sinais.")
         return
 
-    # Índice por data (somente a coluna 'Close')
-    # Mantém só a coluna Close
-    data_y = data_y[["Close"]].copy()
-    data_y.index = data_y.index.tz_localize(None)  # tira timezone se vier
-
-    # Garante série 1D, mesmo que venha como (N,1)
-    price_map = pd.Series(
-        data_y["Close"].to_numpy().reshape(-1),  # força 1D
-        index=data_y.index
-    )
-
     # Usa o mapa data -> preço
     df["next_date"] = df["date"] + pd.Timedelta(days=1)
     df["next_price_y"] = df["next_date"].map(price_map)
@@ -79,7 +70,7 @@ def main():
     plt.figure(figsize=(12, 6))
 
     # Série de preços completa de Y
-    plt.plot(data_y.index, data_y["Close"], label=f"Preço {ticker_y}", alpha=0.7)
+    plt.plot(price_map.index, price_map.to_numpy(), label=f"Preço {ticker_y}", alpha=0.7)
 
     # Pontos onde o bot mandou BUY_Y
     if not buys.empty:
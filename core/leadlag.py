@@ -1,15 +1,11 @@
-import numpy as np
-
-def compute_returns(prices):
-    # garante vetor 1D
-    prices = np.asarray(prices, dtype=float).reshape(-1)
+from bisect import bisect_left
+from math import inf, nextafter
 
-    if len(prices) < 2:
-        return np.zeros_like(prices, dtype=float)
+import numpy as np
 
-    rets = (prices[1:] - prices[:-1]) / (prices[:-1] + 1e-12)
-    # primeiro retorno = 0 para alinhar tamanhos
-    return np.concatenate(([0.0], rets))
+from core.ledger import EXIT_CODES, TradeLedger
+from core.market import PreparedMarketData
+from core.returns import compute_returns
 
 
 def backtest_lead_lag(
@@ -31,21 +27,112 @@ def backtest_lead_lag(
     Py = Py[:T]
 
     rx = compute_returns(Px)
-    ry = compute_returns(Py)  # ainda não usamos, mas deixei aqui
 
-    cash = 1000.0
-    position = 0.0
-    entry_price = None
+    # no máximo uma trade a cada 2 candles (entra em t, sai >= t+1)
+    state = new_lead_lag_state(capacity=T // 2 + 1)
     equity_curve = []
-    trades = []
 
-    # para lidar com o lag sem olhar o futuro
-    planned_entry_t = None  # candle onde queremos entrar (por causa do lag)
+    step_lead_lag(
+        state, rx, Py, 0, T,
+        threshold=threshold,
+        lag=lag,
+        tp=tp,
+        sl=sl,
+        max_hold=max_hold,
+        fee=fee,
+        horizon=T,
+        equity_curve=equity_curve,
+    )
 
-    for t in range(T):
+    cash = state["cash"]
+    position = state["position"]
+    trades = state["trades"]
+
+    # se terminar ainda com posição aberta, fecha no último preço
+    if position != 0.0:
+        price_y = Py[-1]
+        revenue = position * price_y
+        fee_paid = revenue * fee
+        cash += revenue - fee_paid
+
+        trade = trades.records[-1]
+        pnl = (
+            (price_y - trade["entry_price"]) * position
+            - (trade["fee_entry"] + fee_paid)
+        )
+        trades.close(T - 1, price_y, fee_paid, pnl, "EOD")  # end of data
+        position = 0.0
+
+        # atualiza equity final
+        equity_curve[-1] = cash
+
+    final_equity = cash
+    equity_curve = np.array(equity_curve)
+    total_return = (final_equity / 1000.0 - 1.0) * 100.0
+
+    return {
+        "initial_cash": 1000.0,
+        "final_equity": final_equity,
+        "total_return_pct": total_return,
+        "equity_curve": equity_curve,
+        "trades": trades
+    }
+
+
+def new_lead_lag_state(initial_cash=1000.0, capacity=64):
+    """
+    Estado da estratégia entre candles (ver step_lead_lag).
+    trades é um TradeLedger; a última trade é a aberta quando position != 0.
+    """
+    return {
+        "cash": initial_cash,
+        "position": 0.0,
+        "planned_entry_t": None,
+        "trades": TradeLedger(capacity=capacity),
+    }
+
+
+def step_lead_lag(
+    state, rx, Py, t_start, t_stop,
+    threshold=-0.01,
+    lag=1,
+    tp=0.02,
+    sl=-0.01,
+    max_hold=10,
+    fee=0.0005,
+    horizon=None,
+    equity_curve=None,
+):
+    """
+    Processa os candles [t_start, t_stop) a partir de 'state' (alterado no
+    lugar). É o laço do backtest_lead_lag, retomável: processar [0, a) e
+    depois [a, b) dá exatamente o mesmo que [0, b) de uma vez.
+
+    horizon: nº total de candles da série. Entradas planejadas para além
+    dele são descartadas (como no backtest, que conhece o fim dos dados);
+    None = série aberta (paper trading), a entrada fica pendente.
+
+    Não fecha posição no fim: isso é coisa do backtest (EOD).
+    """
+    cash = state["cash"]
+    position = state["position"]
+    planned_entry_t = state["planned_entry_t"]
+    trades = state["trades"]
+    T = horizon if horizon is not None else inf
+
+    # trade aberta (se houver) em variáveis locais
+    open_entry_t = open_entry_price = open_fee_entry = None
+    if position != 0.0:
+        trade = trades.records[-1]
+        open_entry_t = trade["entry_t"]
+        open_entry_price = trade["entry_price"]
+        open_fee_entry = trade["fee_entry"]
+
+    for t in range(t_start, t_stop):
         price_y = Py[t]
         equity = cash + position * price_y
-        equity_curve.append(equity)
+        if equity_curve is not None:
+            equity_curve.append(equity)
 
         # não há retorno definido em t=0 (rx[-1] não faz sentido)
         if t == 0:
@@ -67,13 +154,14 @@ def backtest_lead_lag(
                 if size > 0 and cash >= cost + fee_paid:
                     cash -= cost + fee_paid
                     position = size
-                    trades.append({
-                        "signal_t": planned_entry_t - lag,  # quando o sinal aconteceu
-                        "entry_t": t,                        # quando entrou de fato
-                        "entry_price": entry_price,
-                        "size": size,
-                        "fee_entry": fee_paid
-                    })
+                    trades.open(
+                        planned_entry_t - lag,  # quando o sinal aconteceu
+                        t,                      # quando entrou de fato
+                        entry_price,
+                        size,
+                        fee_paid,
+                    )
+                    open_entry_t, open_entry_price, open_fee_entry = t, entry_price, fee_paid
 
                 # limpa o plano de entrada, mesmo que não tenha conseguido entrar
                 planned_entry_t = None
@@ -93,13 +181,8 @@ def backtest_lead_lag(
                         if size > 0 and cash >= cost + fee_paid:
                             cash -= cost + fee_paid
                             position = size
-                            trades.append({
-                                "signal_t": t,
-                                "entry_t": t,
-                                "entry_price": entry_price,
-                                "size": size,
-                                "fee_entry": fee_paid
-                            })
+                            trades.open(t, t, entry_price, size, fee_paid)
+                            open_entry_t, open_entry_price, open_fee_entry = t, entry_price, fee_paid
                     else:
                         # agenda uma entrada futura em t + lag (sem olhar o preço futuro)
                         target_t = t + lag
@@ -110,9 +193,8 @@ def backtest_lead_lag(
         # 2) Se JÁ temos posição aberta -> checar saída
         # =====================================================
         else:
-            trade = trades[-1]  # trade mais recente
-            hold_time = t - trade["entry_t"]
-            entry_price = trade["entry_price"]
+            hold_time = t - open_entry_t
+            entry_price = open_entry_price
             ret_trade = (price_y - entry_price) / (entry_price + 1e-12)
 
             exit_reason = None
@@ -128,49 +210,577 @@ def backtest_lead_lag(
                 fee_paid = revenue * fee
                 cash += revenue - fee_paid
 
-                trades[-1]["exit_t"] = t
-                trades[-1]["exit_price"] = price_y
-                trades[-1]["fee_exit"] = fee_paid
-                trades[-1]["pnl"] = (
+                pnl = (
                     (price_y - entry_price) * position
-                    - (trades[-1]["fee_entry"] + fee_paid)
+                    - (open_fee_entry + fee_paid)
                 )
-                trades[-1]["exit_reason"] = exit_reason
+                trades.close(t, price_y, fee_paid, pnl, exit_reason)
 
                 position = 0.0
                 entry_price = None
                 planned_entry_t = None  # não deve haver plano de entrada ativo com posição aberta
 
-    # fim do loop principal
+    state["cash"] = cash
+    state["position"] = position
+    state["planned_entry_t"] = planned_entry_t
+    return state
 
-    # se terminar ainda com posição aberta, fecha no último preço
-    if position != 0.0:
+
+def backtest_lead_lag_batch(
+    Px, Py,
+    thresholds,
+    tps,
+    sls,
+    lags,
+    max_holds,
+    fee=0.0005,
+    return_equity=True,
+):
+    """
+    Versão vetorizada do backtest_lead_lag para N genomas de uma vez.
+
+    Os genomas vêm como struct-of-arrays (um vetor de tamanho N por gene).
+    O tempo continua sendo percorrido candle a candle (a estratégia é uma
+    máquina de estados), mas cada passo atualiza o estado dos N genomas
+    com operações NumPy sobre vetores (N,).
+
+    As contas são feitas na mesma ordem do backtest escalar, então
+    final_equity, nº de trades e curvas de equity batem exatamente.
+
+    Retorna um dict com:
+      - initial_cash
+      - final_equity      (N,)
+      - total_return_pct  (N,)
+      - n_trades          (N,)
+      - equity_curves     (N, T) ou None se return_equity=False
+    """
+    Px = np.asarray(Px, dtype=float).reshape(-1)
+    Py = np.asarray(Py, dtype=float).reshape(-1)
+
+    T = min(len(Px), len(Py))
+    Px = Px[:T]
+    Py = Py[:T]
+
+    thresholds = np.asarray(thresholds, dtype=float).reshape(-1)
+    tps = np.asarray(tps, dtype=float).reshape(-1)
+    sls = np.asarray(sls, dtype=float).reshape(-1)
+    lags = np.asarray(lags, dtype=np.int64).reshape(-1)
+    max_holds = np.asarray(max_holds, dtype=np.int64).reshape(-1)
+
+    N = len(thresholds)
+    for name, arr in (("tps", tps), ("sls", sls), ("lags", lags), ("max_holds", max_holds)):
+        if len(arr) != N:
+            raise ValueError(f"{name} tem tamanho {len(arr)}, esperado {N}")
+
+    rx = compute_returns(Px)
+
+    cash = np.full(N, 1000.0)
+    position = np.zeros(N)
+    entry_t = np.zeros(N, dtype=np.int64)
+    entry_price = np.zeros(N)
+    planned_entry_t = np.full(N, -1, dtype=np.int64)  # -1 = sem entrada planejada
+    n_trades = np.zeros(N, dtype=np.int64)
+
+    equity_curves = np.empty((N, T)) if return_equity else None
+
+    lag_zero = lags == 0
+    entry_mult = 1.0 + fee
+
+    def _try_enter(mask, t, price_y):
+        # mesma conta do backtest escalar, só que para os genomas em 'mask'
+        idx = np.flatnonzero(mask)
+        c = cash[idx]
+        size = c / (price_y * entry_mult)
+        cost = size * price_y
+        fee_paid = cost * fee
+        ok = (size > 0) & (c >= cost + fee_paid)
+        if ok.any():
+            idx_ok = idx[ok]
+            cash[idx_ok] = c[ok] - (cost[ok] + fee_paid[ok])
+            position[idx_ok] = size[ok]
+            entry_t[idx_ok] = t
+            entry_price[idx_ok] = price_y
+            n_trades[idx_ok] += 1
+
+    for t in range(T):
+        price_y = Py[t]
+        if return_equity:
+            equity_curves[:, t] = cash + position * price_y
+
+        if t == 0:
+            continue
+
+        # quem já estava posicionado no começo do candle só pode sair
+        holding = position != 0.0
+        flat = ~holding
+
+        # 1a) entradas planejadas que venceram
+        due = flat & (planned_entry_t >= 0) & (t >= planned_entry_t)
+        if due.any():
+            _try_enter(due, t, price_y)
+            planned_entry_t[due] = -1
+
+        # 1b) novos sinais (rx[t-1] só olha o passado)
+        signal = (position == 0.0) & (planned_entry_t < 0) & (rx[t - 1] <= thresholds)
+        if signal.any():
+            now = signal & lag_zero
+            if now.any():
+                _try_enter(now, t, price_y)
+
+            later = signal & ~lag_zero
+            if later.any():
+                target_t = t + lags
+                schedule = later & (target_t < T)
+                planned_entry_t[schedule] = target_t[schedule]
+
+        # 2) saídas de quem estava posicionado
+        if holding.any():
+            idx = np.flatnonzero(holding)
+            ep = entry_price[idx]
+            ret_trade = (price_y - ep) / (ep + 1e-12)
+            hold_time = t - entry_t[idx]
+            exit_now = (
+                (ret_trade >= tps[idx])
+                | (ret_trade <= sls[idx])
+                | (hold_time >= max_holds[idx])
+            )
+            if exit_now.any():
+                idx_exit = idx[exit_now]
+                revenue = position[idx_exit] * price_y
+                fee_paid = revenue * fee
+                cash[idx_exit] = cash[idx_exit] + (revenue - fee_paid)
+                position[idx_exit] = 0.0
+                planned_entry_t[idx_exit] = -1
+
+    # fecha no último preço quem terminou posicionado
+    open_end = position != 0.0
+    if open_end.any():
         price_y = Py[-1]
+        revenue = position[open_end] * price_y
+        fee_paid = revenue * fee
+        cash[open_end] = cash[open_end] + (revenue - fee_paid)
+        position[open_end] = 0.0
+        if return_equity:
+            equity_curves[open_end, -1] = cash[open_end]
+
+    final_equity = cash
+    total_return = (final_equity / 1000.0 - 1.0) * 100.0
+
+    return {
+        "initial_cash": 1000.0,
+        "final_equity": final_equity,
+        "total_return_pct": total_return,
+        "n_trades": n_trades,
+        "equity_curves": equity_curves,
+    }
+
+
+def _exit_price_bounds(entry_price, tp, sl):
+    """
+    Converte as regras de TP/SL em limites de preço EXATOS.
+
+    ret = (p - entry) / (entry + 1e-12) é monótono em p, então existe um
+    menor preço que dispara o TP e um maior preço que dispara o SL.
+    Parte da conta "de cabeça" e ajusta ulp a ulp até a fronteira.
+    """
+    den = entry_price + 1e-12
+
+    def ret(p):
+        return (p - entry_price) / den
+
+    tp_price = entry_price + tp * den
+    if ret(tp_price) >= tp:
+        while ret(nextafter(tp_price, -inf)) >= tp:
+            tp_price = nextafter(tp_price, -inf)
+    else:
+        while not ret(tp_price) >= tp and tp_price < inf:
+            tp_price = nextafter(tp_price, inf)
+
+    sl_price = entry_price + sl * den
+    if ret(sl_price) <= sl:
+        while ret(nextafter(sl_price, inf)) <= sl:
+            sl_price = nextafter(sl_price, inf)
+    else:
+        while not ret(sl_price) <= sl and sl_price > -inf:
+            sl_price = nextafter(sl_price, -inf)
+
+    return tp_price, sl_price
+
+
+def backtest_lead_lag_events(
+    Px, Py,
+    threshold=-0.01,
+    lag=1,
+    tp=0.02,
+    sl=-0.01,
+    max_hold=10,
+    fee=0.0005,
+    market=None,
+    return_equity=False,
+    mode="full",
+    checkpoints=(),
+    snapshot_at=(),
+    resume=None,
+):
+    """
+    Backtest orientado a eventos: mesma lógica do backtest_lead_lag, mas
+    sem visitar cada candle.
+
+    - Sem posição: pula direto para o próximo candle com sinal
+      (rx[t-1] <= threshold) ou para a entrada planejada.
+    - Com posição: acha a saída por TP/SL com consultas de primeira
+      passagem num RangeIndex sobre Py (O(log T) por trade) e a saída por
+      tempo direto de max_hold.
+
+    O custo passa a escalar com o nº de trades, não com o nº de candles.
+    Passe um PreparedMarketData em 'market' (Px/Py são ignorados) para
+    reaproveitar retornos, índice de sinais e RangeIndex entre chamadas.
+
+    A curva de equity só é montada se return_equity=True; caso contrário
+    "equity_curve" vem como None e pode ser reconstruída depois com
+    rebuild_equity_curve(Py, trades, n_periods).
+
+    mode="metrics": não devolve trades nem curva, só os agregados de
+    equity_metrics (em "metrics", com os valores de equity nos candles
+    'checkpoints') e "n_trades" -- o necessário para o fitness do GA.
+
+    Snapshots (retomada em janelas com o mesmo início): 'snapshot_at' lista
+    candles b em que o estado da estratégia (caixa, entrada planejada,
+    trade aberta e trades já feitas) é guardado em "snapshots"; só valem
+    b <= T - max(lag, 1), onde o estado não depende do fim dos dados. Com
+    resume=snapshot, um backtest sobre uma janela com o mesmo início e
+    T' >= b + max(lag, 1) candles começa em b e dá exatamente o mesmo
+    resultado que rodar do zero.
+    """
+    if market is None:
+        market = PreparedMarketData(Px, Py)
+
+    Py = market.Py
+    T = len(market)
+    range_index = market.range_index
+    # candles t em [1, T) com sinal no candle anterior
+    signal_bars = market.signal_bars(threshold).tolist()
+
+    # saída por tempo: hold_time >= max_hold só é checado a partir de entry_t + 1
+    time_hold = max(int(max_hold), 1)
+
+    in_trade = False
+    first_snapshot = 0
+    if resume is None:
+        cash = 1000.0
+        trades = TradeLedger(capacity=T // 2 + 1)
+        planned_entry_t = None
+        t = 1
+    else:
+        t = resume["t"]
+        if not 0 < t <= T - max(int(lag), 1):
+            raise ValueError(f"snapshot do candle {t} não serve para {T} candles com lag={lag}")
+        cash = resume["cash"]
+        trades = TradeLedger.from_records(resume["records"], capacity=T // 2 + 1)
+        planned_entry_t = resume["planned_entry_t"]
+        in_trade = resume["in_trade"]
+        first_snapshot = t
+        if in_trade:
+            # a trade aberta no snapshot volta a procurar a saída desde a entrada
+            t = int(trades.records[-1]["entry_t"])
+
+    # só candles cujo estado não depende do fim dos dados
+    last_snapshot = T - max(int(lag), 1)
+    snapshot_at = sorted(b for b in snapshot_at if first_snapshot <= b <= last_snapshot)
+    snapshots = []
+    next_snapshot = snapshot_at[0] if snapshot_at else T
+
+    while t < T:
+        if in_trade:
+            in_trade = False
+        else:
+            if planned_entry_t is not None:
+                # nada acontece até a entrada planejada
+                t = planned_entry_t
+            else:
+                i = bisect_left(signal_bars, t)
+                if i >= len(signal_bars):
+                    break
+                t = signal_bars[i]
+
+            # snapshots dos candles sem posição até aqui
+            while next_snapshot <= t:
+                snapshots.append(_snapshot(next_snapshot, cash, planned_entry_t, trades, False))
+                next_snapshot = snapshot_at[len(snapshots)] if len(snapshots) < len(snapshot_at) else T
+
+            entered = False
+
+            # 1a) executa a entrada planejada
+            if planned_entry_t is not None:
+                entered, cash = _try_entry(trades, cash, Py[t], fee, planned_entry_t - lag, t)
+                planned_entry_t = None
+
+                # 1b) novo sinal no mesmo candle (se a entrada não aconteceu)
+                if not entered and market.leader_return(t - 1) <= threshold:
+                    if lag == 0:
+                        entered, cash = _try_entry(trades, cash, Py[t], fee, t, t)
+                    elif t + lag < T:
+                        planned_entry_t = t + lag
+
+            # 1b) candle de sinal
+            elif lag == 0:
+                entered, cash = _try_entry(trades, cash, Py[t], fee, t, t)
+            elif t + lag < T:
+                planned_entry_t = t + lag
+
+            if not entered:
+                t += 1
+                continue
+
+        # 2) posição aberta em t -> procura a saída
+        trade = trades.records[-1]
+        entry_t = t
+        entry_price = trade["entry_price"]
+        position = trade["size"]
+        tp_price, sl_price = _exit_price_bounds(float(entry_price), tp, sl)
+
+        time_t = entry_t + time_hold
+        search_stop = min(time_t + 1, T)
+        tp_t = range_index.first_at_least(tp_price, entry_t + 1, search_stop)
+        sl_t = range_index.first_at_most(sl_price, entry_t + 1, search_stop)
+
+        exit_t, exit_reason = None, None
+        if tp_t >= 0 and (sl_t < 0 or tp_t <= sl_t):
+            exit_t, exit_reason = tp_t, "TP"
+        elif sl_t >= 0:
+            exit_t, exit_reason = sl_t, "SL"
+        elif time_t < T:
+            exit_t, exit_reason = time_t, "TIME"
+
+        if exit_t is None:
+            # termina posicionado: fecha no último preço
+            exit_t, exit_reason = T - 1, "EOD"
+
+        # snapshots dos candles com esta trade aberta (a saída é refeita na retomada)
+        while next_snapshot <= exit_t:
+            snapshots.append(_snapshot(next_snapshot, cash, None, trades, True))
+            next_snapshot = snapshot_at[len(snapshots)] if len(snapshots) < len(snapshot_at) else T
+
+        price_y = Py[exit_t]
         revenue = position * price_y
         fee_paid = revenue * fee
         cash += revenue - fee_paid
 
-        trades[-1]["exit_t"] = T - 1
-        trades[-1]["exit_price"] = price_y
-        trades[-1]["fee_exit"] = fee_paid
-        trades[-1]["pnl"] = (
-            (price_y - trades[-1]["entry_price"]) * position
-            - (trades[-1]["fee_entry"] + fee_paid)
+        pnl = (
+            (price_y - entry_price) * position
+            - (trade["fee_entry"] + fee_paid)
         )
-        trades[-1]["exit_reason"] = "EOD"  # end of data
-        position = 0.0
+        trades.close(exit_t, price_y, fee_paid, pnl, exit_reason)
 
-        # atualiza equity final
-        equity_curve[-1] = cash
+        t = exit_t + 1
+
+    # sem mais eventos: o resto dos snapshots é sem posição
+    for b in snapshot_at[len(snapshots):]:
+        snapshots.append(_snapshot(b, cash, planned_entry_t, trades, False))
 
     final_equity = cash
-    equity_curve = np.array(equity_curve)
     total_return = (final_equity / 1000.0 - 1.0) * 100.0
 
+    if mode == "metrics":
+        return {
+            "initial_cash": 1000.0,
+            "final_equity": final_equity,
+            "total_return_pct": total_return,
+            "n_trades": len(trades),
+            "n_periods": T,
+            "metrics": equity_metrics(Py, trades, T, checkpoints),
+            "snapshots": snapshots,
+        }
+
+    equity_curve = rebuild_equity_curve(Py, trades, T) if return_equity else None
+
     return {
         "initial_cash": 1000.0,
         "final_equity": final_equity,
         "total_return_pct": total_return,
         "equity_curve": equity_curve,
-        "trades": trades
+        "trades": trades,
+        "n_periods": T,
+        "snapshots": snapshots,
+    }
+
+
+def _snapshot(t, cash, planned_entry_t, trades, in_trade):
+    """
+    Estado do backtest por eventos no começo do candle t (ver resume).
+    Com in_trade=True a última trade ainda está aberta: a saída depende do
+    fim dos dados e é refeita na retomada.
+    """
+    return {
+        "t": t,
+        "cash": cash,
+        "planned_entry_t": planned_entry_t,
+        "in_trade": in_trade,
+        "records": trades.records.copy(),
+    }
+
+
+def _try_entry(trades, cash, price_y, fee, signal_t, entry_t):
+    """Entrada com as mesmas contas (e a mesma checagem de caixa) do escalar."""
+    size = cash / (price_y * (1.0 + fee))
+    cost = size * price_y
+    fee_paid = cost * fee
+
+    if size > 0 and cash >= cost + fee_paid:
+        trades.open(signal_t, entry_t, price_y, size, fee_paid)
+        return True, cash - (cost + fee_paid)
+
+    return False, cash
+
+
+def _equity_segments(trades, n_periods, initial_cash=1000.0):
+    """
+    Segmentos da curva de equity: flat até a entrada, posicionado até a
+    saída. No segmento k (candles [bounds[k], bounds[k+1])) a equity é
+    levels[k] + positions[k] * Py[t].
+
+    Retorna (levels, positions, bounds, caixa final, fechou_por_EOD).
+    """
+    if not isinstance(trades, TradeLedger):
+        trades = TradeLedger.from_dicts(trades)
+
+    rec = trades.records
+    n = len(rec)
+
+    # caixa antes de cada entrada / durante cada trade (ordem das contas do escalar)
+    levels = np.empty(2 * n + 1)
+    cash = initial_cash
+    size = rec["size"].tolist()
+    entry_price = rec["entry_price"].tolist()
+    exit_price = rec["exit_price"].tolist()
+    fee_entry = rec["fee_entry"].tolist()
+    fee_exit = rec["fee_exit"].tolist()
+    for k in range(n):
+        levels[2 * k] = cash
+        cash -= size[k] * entry_price[k] + fee_entry[k]
+        levels[2 * k + 1] = cash
+        cash += size[k] * exit_price[k] - fee_exit[k]
+    levels[2 * n] = cash
+
+    positions = np.zeros(2 * n + 1)
+    positions[1::2] = rec["size"]
+
+    # flat: [saída anterior + 1, entrada]; posicionado: [entrada + 1, saída]
+    bounds = np.empty(2 * n + 2, dtype=np.int64)
+    bounds[0] = 0
+    bounds[1:-1:2] = rec["entry_t"] + 1
+    bounds[2:-1:2] = rec["exit_t"] + 1
+    bounds[-1] = n_periods
+
+    eod = bool(n) and rec["exit_reason"][-1] == EXIT_CODES["EOD"]
+    return levels, positions, bounds, cash, eod
+
+
+def rebuild_equity_curve(Py, trades, n_periods, initial_cash=1000.0):
+    """
+    Reconstrói a curva de equity candle a candle a partir das trades
+    (TradeLedger ou lista de dicts), reproduzindo exatamente a curva do
+    backtest_lead_lag.
+
+    A curva é montada por segmentos (flat até a entrada, posicionado até a
+    saída): caixa e posição são constantes em cada segmento.
+    """
+    Py = np.asarray(Py, dtype=float).reshape(-1)[:n_periods]
+    levels, positions, bounds, cash, eod = _equity_segments(trades, n_periods, initial_cash)
+    lengths = np.diff(bounds)
+
+    equity = np.repeat(levels, lengths) + np.repeat(positions, lengths) * Py
+
+    # fechamento forçado no fim: o último ponto já é o caixa final
+    if eod:
+        equity[-1] = cash
+
+    return equity
+
+
+def equity_metrics(Py, trades, n_periods, checkpoints=(), initial_cash=1000.0, block=4096):
+    """
+    Agregados da curva de equity sem materializá-la inteira: a curva é
+    montada em blocos de 'block' candles (mesmas contas do
+    rebuild_equity_curve) e cada bloco alimenta pico corrente, drawdown
+    máximo e momentos dos retornos r_t = (E_t - E_{t-1}) / E_{t-1}.
+    A memória fica limitada pelo bloco, não por n_periods.
+
+    Retorna dict com:
+      - mdd_pct            drawdown máximo (%) (igual a max_drawdown da curva)
+      - n_returns, mean_return
+      - n_neg, neg_std     nº e desvio (populacional) dos retornos < 0
+      - checkpoints        {t: E_t} para cada t pedido em 'checkpoints'
+    """
+    Py = np.asarray(Py, dtype=float).reshape(-1)[:n_periods]
+    levels, positions, bounds, cash, eod = _equity_segments(trades, n_periods, initial_cash)
+
+    acc = _EquityAccumulator()
+    for c0 in range(0, n_periods, block):
+        c1 = min(c0 + block, n_periods)
+        lengths = np.diff(np.clip(bounds, c0, c1))
+        eq = np.repeat(levels, lengths) + np.repeat(positions, lengths) * Py[c0:c1]
+        # fechamento forçado no fim: o último ponto já é o caixa final
+        if eod and c1 == n_periods:
+            eq[-1] = cash
+        acc.add(eq)
+
+    values = {}
+    if len(checkpoints):
+        idx = np.asarray(checkpoints, dtype=np.int64)
+        seg = np.searchsorted(bounds, idx, side="right") - 1
+        vals = levels[seg] + positions[seg] * Py[idx]
+        if eod:
+            vals[idx == n_periods - 1] = cash
+        values = dict(zip(idx.tolist(), vals.tolist()))
+
+    n_returns = max(n_periods - 1, 0)
+    return {
+        "mdd_pct": acc.dd_min * 100.0 if n_periods else 0.0,
+        "n_returns": n_returns,
+        "mean_return": acc.ret_sum / n_returns if n_returns else 0.0,
+        "n_neg": acc.neg_n,
+        "neg_std": (acc.neg_m2 / acc.neg_n) ** 0.5 if acc.neg_n else 0.0,
+        "checkpoints": values,
     }
+
+
+class _EquityAccumulator:
+    """Pico, drawdown e momentos dos retornos de uma curva recebida em blocos."""
+
+    def __init__(self):
+        self.prev = None
+        self.peak = -inf
+        self.dd_min = inf
+        self.ret_sum = 0.0
+        # retornos negativos: contagem, média e soma dos quadrados dos desvios
+        self.neg_n, self.neg_mean, self.neg_m2 = 0, 0.0, 0.0
+
+    def add(self, eq):
+        """Próximo pedaço da curva (em ordem)."""
+        if self.prev is None:
+            before, after = eq[:-1], eq[1:]
+        else:
+            before = np.empty(len(eq))
+            before[0] = self.prev
+            before[1:] = eq[:-1]
+            after = eq
+        rets = (after - before) / (before + 1e-12)
+        self.ret_sum += rets.sum()
+        neg = rets[rets < 0]
+        if len(neg):
+            mean = neg.mean()
+            self._merge_neg(len(neg), mean, ((neg - mean) ** 2).sum())
+
+        peaks = np.maximum(np.maximum.accumulate(eq), self.peak)
+        self.dd_min = min(self.dd_min, ((eq - peaks) / (peaks + 1e-12)).min())
+        self.peak = float(peaks[-1])
+        self.prev = float(eq[-1])
+
+    def _merge_neg(self, n_b, mean_b, m2_b):
+        # combinação de (n, média, M2) de dois grupos (Chan et al.)
+        n = self.neg_n + n_b
+        delta = mean_b - self.neg_mean
+        self.neg_mean += delta * n_b / n
+        self.neg_m2 += m2_b + delta * delta * self.neg_n * n_b / n
+        self.neg_n = n
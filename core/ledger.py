@@ -0,0 +1,161 @@
+import numpy as np
+
+# motivo de saída codificado (0 = trade ainda aberta)
+EXIT_REASONS = ("", "TP", "SL", "TIME", "EOD")
+EXIT_CODES = {name: code for code, name in enumerate(EXIT_REASONS)}
+
+TRADE_DTYPE = np.dtype([
+    ("signal_t", np.int64),
+    ("entry_t", np.int64),
+    ("exit_t", np.int64),
+    ("entry_price", np.float64),
+    ("exit_price", np.float64),
+    ("size", np.float64),
+    ("fee_entry", np.float64),
+    ("fee_exit", np.float64),
+    ("pnl", np.float64),
+    ("exit_reason", np.int8),
+])
+
+_ENTRY_FIELDS = ("signal_t", "entry_t", "entry_price", "size", "fee_entry")
+_EXIT_FIELDS = ("exit_t", "exit_price", "fee_exit", "pnl", "exit_reason")
+
+
+class TradeLedger:
+    """
+    Livro de trades pré-alocado, guardado num array estruturado NumPy
+    (TRADE_DTYPE): uma linha por trade, sem um dict por trade.
+
+    Compatível com o uso antigo de lista de dicts: len(), iteração,
+    ledger[-1]["pnl"], ledger[-3:], tr.get("exit_t") ... devolvem
+    TradeView, que lê e escreve direto no array. Os campos de saída só
+    "existem" na view depois que a trade foi fechada.
+
+    'records' expõe o array (só as linhas usadas) para estatísticas
+    vetorizadas.
+    """
+
+    def __init__(self, capacity=64):
+        self._data = np.zeros(max(1, capacity), dtype=TRADE_DTYPE)
+        self._n = 0
+
+    @classmethod
+    def from_dicts(cls, trades):
+        ledger = cls(capacity=len(trades))
+        for tr in trades:
+            ledger.open(*(tr[k] for k in _ENTRY_FIELDS))
+            if "exit_t" in tr:
+                ledger.close(*(tr[k] for k in _EXIT_FIELDS))
+        return ledger
+
+    @classmethod
+    def from_records(cls, records, capacity=64):
+        """Livro com uma cópia de 'records' (array TRADE_DTYPE), ex.: de um snapshot."""
+        ledger = cls(capacity=max(capacity, len(records)))
+        ledger._data[:len(records)] = records
+        ledger._n = len(records)
+        return ledger
+
+    @property
+    def records(self):
+        return self._data[:self._n]
+
+    def open(self, signal_t, entry_t, entry_price, size, fee_entry):
+        """Registra uma trade nova (aberta)."""
+        if self._n == len(self._data):
+            self._data = np.resize(self._data, 2 * len(self._data))
+        self._data[self._n] = (signal_t, entry_t, -1, entry_price, np.nan, size, fee_entry, np.nan, np.nan, 0)
+        self._n += 1
+
+    def close(self, exit_t, exit_price, fee_exit, pnl, exit_reason):
+        """Fecha a última trade."""
+        rec = self._data[self._n - 1]
+        rec["exit_t"] = exit_t
+        rec["exit_price"] = exit_price
+        rec["fee_exit"] = fee_exit
+        rec["pnl"] = pnl
+        rec["exit_reason"] = EXIT_CODES[exit_reason]
+
+    def exit_reasons(self):
+        """Motivos de saída como strings ('' = aberta)."""
+        return np.array(EXIT_REASONS, dtype=object)[self.records["exit_reason"]]
+
+    def to_dicts(self):
+        return [dict(tr) for tr in self]
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [TradeView(self, j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("trade fora do intervalo")
+        return TradeView(self, i)
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield TradeView(self, i)
+
+    def __eq__(self, other):
+        if isinstance(other, TradeLedger):
+            other = other.to_dicts()
+        return self.to_dicts() == list(other)
+
+    def __repr__(self):
+        return f"TradeLedger({self.to_dicts()!r})"
+
+
+class TradeView:
+    """Uma trade do TradeLedger vista como dict (leitura e escrita)."""
+
+    __slots__ = ("_ledger", "_i")
+
+    def __init__(self, ledger, i):
+        self._ledger = ledger
+        self._i = i
+
+    def _is_closed(self):
+        return self._ledger._data[self._i]["exit_reason"] != 0
+
+    def keys(self):
+        return _ENTRY_FIELDS + (_EXIT_FIELDS if self._is_closed() else ())
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        value = self._ledger._data[self._i][key].item()
+        if key == "exit_reason":
+            return EXIT_REASONS[value]
+        return value
+
+    def __setitem__(self, key, value):
+        if key == "exit_reason":
+            value = EXIT_CODES[value]
+        self._ledger._data[self._i][key] = value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
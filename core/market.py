@@ -0,0 +1,159 @@
+import hashlib
+
+import numpy as np
+
+from core.range_index import RangeIndex
+from core.returns import compute_returns
+
+
+class PreparedMarketData:
+    """
+    Dados de mercado pré-processados UMA vez por dataset e reaproveitados
+    em todas as avaliações de genoma.
+
+    Guarda:
+      - Px, Py alinhados (mesmo comprimento)
+      - retornos do líder (rx) e um índice deles ordenado, de modo que os
+        candles candidatos a sinal para qualquer threshold saem de uma
+        única busca binária
+      - RangeIndex sobre Py (saídas por TP/SL no backtest por eventos)
+
+    window(start, stop) devolve a mesma estrutura restrita a
+    [start, stop) sem copiar nada: os arrays são views e os índices são
+    compartilhados. Dentro da janela os índices são locais (t=0 é o
+    primeiro candle da janela) e rx[0] = 0, exatamente como se a janela
+    tivesse sido fatiada e preparada do zero.
+    """
+
+    def __init__(self, Px, Py):
+        Px = np.asarray(Px, dtype=float).reshape(-1)
+        Py = np.asarray(Py, dtype=float).reshape(-1)
+
+        T = min(len(Px), len(Py))
+        self._Px = Px[:T]
+        self._Py = Py[:T]
+
+        self._rx = compute_returns(self._Px)
+        self._rx_order = np.argsort(self._rx, kind="stable")
+        self._rx_sorted = self._rx[self._rx_order]
+
+        self._range_index = RangeIndex(self._Py)
+
+        self.start = 0
+        self.stop = T
+        self._fingerprint = None
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Reconstrói a preparação a partir de arrays(), sem recalcular nada
+        (ex.: views somente-leitura de um SharedArrays num worker).
+        """
+        market = cls.__new__(cls)
+        market._Px = arrays["Px"]
+        market._Py = arrays["Py"]
+        market._rx = arrays["rx"]
+        market._rx_order = arrays["rx_order"]
+        market._rx_sorted = arrays["rx_sorted"]
+
+        n_levels = sum(1 for key in arrays if key.startswith("range_max_"))
+        market._range_index = RangeIndex.from_tables(
+            [arrays[f"range_max_{k}"] for k in range(n_levels)],
+            [arrays[f"range_min_{k}"] for k in range(n_levels)],
+        )
+
+        market.start = 0
+        market.stop = len(market._Px)
+        market._fingerprint = None
+        return market
+
+    def arrays(self):
+        """
+        Arrays do dataset base já preparado (preços, retornos, ordem dos
+        retornos e tabelas do RangeIndex), para publicar em memória
+        compartilhada; ver from_arrays.
+        """
+        arrays = {
+            "Px": self._Px,
+            "Py": self._Py,
+            "rx": self._rx,
+            "rx_order": self._rx_order,
+            "rx_sorted": self._rx_sorted,
+        }
+        max_levels, min_levels = self._range_index.tables()
+        for k, (mx, mn) in enumerate(zip(max_levels, min_levels)):
+            arrays[f"range_max_{k}"] = mx
+            arrays[f"range_min_{k}"] = mn
+        return arrays
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def Px(self):
+        return self._Px[self.start:self.stop]
+
+    @property
+    def Py(self):
+        return self._Py[self.start:self.stop]
+
+    @property
+    def range_index(self):
+        return self._range_index.view(self.start, self.stop)
+
+    def window(self, start, stop):
+        """Janela [start, stop) (índices locais a esta janela), sem cópia."""
+        n = len(self)
+        start = max(0, min(start, n))
+        stop = max(start, min(stop, n))
+
+        sub = PreparedMarketData.__new__(PreparedMarketData)
+        sub.__dict__.update(self.__dict__)
+        sub.start = self.start + start
+        sub.stop = self.start + stop
+        sub._fingerprint = None
+        return sub
+
+    def base(self):
+        """O dataset inteiro do qual esta janela é view."""
+        full = PreparedMarketData.__new__(PreparedMarketData)
+        full.__dict__.update(self.__dict__)
+        full.start = 0
+        full.stop = len(self._Px)
+        full._fingerprint = None
+        return full
+
+    @property
+    def fingerprint(self):
+        """Hash do conteúdo (Px, Py) da janela, calculado uma vez."""
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(np.ascontiguousarray(self.Px).tobytes())
+            h.update(np.ascontiguousarray(self.Py).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def leader_return(self, t):
+        """rx[t] da janela (o primeiro retorno da janela é 0)."""
+        if t == 0:
+            return 0.0
+        return self._rx[self.start + t]
+
+    def signal_bars(self, threshold):
+        """
+        Candles t (locais, em [1, len)) com rx[t-1] <= threshold, em ordem.
+        """
+        n = len(self)
+        if n < 2:
+            return np.zeros(0, dtype=np.int64)
+
+        k = np.searchsorted(self._rx_sorted, threshold, side="right")
+        j = self._rx_order[:k]
+        # rx[j] global decide o sinal do candle j+1; o primeiro retorno
+        # da janela (j = start) não vale, ali o retorno é 0
+        j = j[(j > self.start) & (j < self.stop - 1)]
+        bars = np.sort(j) - self.start + 1
+
+        if 0.0 <= threshold:
+            bars = np.concatenate(([1], bars))
+        return bars
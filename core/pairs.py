@@ -0,0 +1,91 @@
+import numpy as np
+
+
+def panel_returns(prices):
+    """
+    Retornos simples coluna a coluna de um painel (T, N), mesma conta do
+    compute_returns (primeira linha = 0).
+    """
+    prices = np.asarray(prices, dtype=float)
+    rets = np.zeros_like(prices)
+    if len(prices) >= 2:
+        rets[1:] = (prices[1:] - prices[:-1]) / (prices[:-1] + 1e-12)
+    return rets
+
+
+def lagged_cross_correlation(returns, max_lag=3, chunk_bytes=64 * 2**20):
+    """
+    Correlação cruzada defasada de todos os pares de um painel de retornos
+    (T, N), via FFT.
+
+    Retorna C com shape (max_lag + 1, N, N):
+        C[L, i, j] = corr(r_i[t - L], r_j[t])
+    ou seja, i (líder) L candles antes de j (seguidor).
+
+    O espectro de cada série é calculado uma vez; os produtos cruzados são
+    feitos em blocos de líderes para limitar a memória a ~chunk_bytes.
+    """
+    returns = np.asarray(returns, dtype=float)
+    T, N = returns.shape
+
+    # padroniza (NaN/constante viram 0 e não correlacionam com nada)
+    z = np.nan_to_num(returns - np.nanmean(returns, axis=0))
+    std = z.std(axis=0)
+    z = np.divide(z, std, out=np.zeros_like(z), where=std > 1e-12)
+
+    nfft = 1 << int(2 * T - 1).bit_length()  # sem aliasing circular
+    F = np.fft.rfft(z, n=nfft, axis=0)       # (nf, N)
+    nf = F.shape[0]
+
+    # nº de termos em cada defasagem
+    overlap = (T - np.arange(max_lag + 1)).astype(float)
+    overlap[overlap <= 0] = np.inf
+
+    C = np.empty((max_lag + 1, N, N))
+    chunk = max(1, int(chunk_bytes // (16 * nf * N)))
+    for i0 in range(0, N, chunk):
+        i1 = min(N, i0 + chunk)
+        # sum_t z_i[t] z_j[t + L] = irfft(conj(F_i) F_j)[L]
+        cross = np.conj(F[:, i0:i1, None]) * F[:, None, :]
+        xc = np.fft.irfft(cross, n=nfft, axis=0)[:max_lag + 1]
+        C[:, i0:i1, :] = xc / overlap[:, None, None]
+
+    return C
+
+
+def screen_pairs(returns, tickers, max_lag=3, min_lag=1, top_k=None):
+    """
+    Ranqueia os pares ordenados (líder, seguidor) pela força da relação
+    lead-lag: maior |corr| entre as defasagens min_lag..max_lag.
+
+    Retorna uma lista de dicts ordenada do mais forte para o mais fraco
+    (os top_k primeiros, se top_k for dado).
+    """
+    C = lagged_cross_correlation(returns, max_lag=max_lag)
+    N = len(tickers)
+
+    lead = np.abs(C[min_lag:])                 # (L, N, N)
+    best = lead.argmax(axis=0)                 # defasagem (relativa) mais forte
+    score = np.take_along_axis(lead, best[None], axis=0)[0]
+    score[np.arange(N), np.arange(N)] = -np.inf  # sem par consigo mesmo
+
+    order = np.argsort(score, axis=None)[::-1]
+    n_pairs = N * (N - 1)
+    if top_k is not None:
+        n_pairs = min(n_pairs, top_k)
+
+    rows = []
+    for flat in order[:n_pairs]:
+        i, j = np.unravel_index(flat, score.shape)
+        lag = int(best[i, j]) + min_lag
+        rows.append({
+            "leader": tickers[i],
+            "follower": tickers[j],
+            "leader_idx": int(i),
+            "follower_idx": int(j),
+            "best_lag": lag,
+            "corr": float(C[lag, i, j]),
+            "corr_lag0": float(C[0, i, j]),
+            "score": float(score[i, j]),
+        })
+    return rows
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class RangeIndex:
+    """
+    Sparse table de máximos e mínimos sobre uma série de preços.
+
+    Construída uma vez em O(T log T), responde "primeiro índice em
+    [start, stop) com valor >= x" (ou <= x) em O(log T), pulando blocos
+    inteiros que não podem conter o alvo.
+
+    NaN nunca satisfaz a busca (igual à comparação do backtest escalar).
+
+    view(start, stop) devolve um índice sobre values[start:stop] que
+    compartilha as tabelas (sem cópia), com índices locais à janela.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float).reshape(-1)
+        nan = np.isnan(values)
+
+        self.n = len(values)
+        self._offset = 0
+        self._max = [np.where(nan, -np.inf, values)]
+        self._min = [np.where(nan, np.inf, values)]
+
+        k = 1
+        while (1 << k) <= self.n:
+            half = 1 << (k - 1)
+            prev_max = self._max[-1]
+            prev_min = self._min[-1]
+            # nível k: agregado de values[i : i + 2^k]
+            self._max.append(np.maximum(prev_max[:-half], prev_max[half:]))
+            self._min.append(np.minimum(prev_min[:-half], prev_min[half:]))
+            k += 1
+
+    @classmethod
+    def from_tables(cls, max_levels, min_levels):
+        """Índice a partir de tabelas já construídas (ver tables), sem recalcular."""
+        index = cls.__new__(cls)
+        index._max = list(max_levels)
+        index._min = list(min_levels)
+        index._offset = 0
+        index.n = len(index._max[0])
+        return index
+
+    def tables(self):
+        """(níveis de máximo, níveis de mínimo) da sparse table inteira."""
+        return self._max, self._min
+
+    def view(self, start, stop):
+        """Índice sobre values[start:stop], reaproveitando as tabelas."""
+        start = max(0, min(start, self.n))
+        stop = max(start, min(stop, self.n))
+
+        sub = RangeIndex.__new__(RangeIndex)
+        sub._max = self._max
+        sub._min = self._min
+        sub._offset = self._offset + start
+        sub.n = stop - start
+        return sub
+
+    def range_max(self, start, stop):
+        """Máximo de values[start:stop] (stop exclusivo)."""
+        start += self._offset
+        stop += self._offset
+        k = (stop - start).bit_length() - 1
+        return max(self._max[k][start], self._max[k][stop - (1 << k)])
+
+    def range_min(self, start, stop):
+        """Mínimo de values[start:stop] (stop exclusivo)."""
+        start += self._offset
+        stop += self._offset
+        k = (stop - start).bit_length() - 1
+        return min(self._min[k][start], self._min[k][stop - (1 << k)])
+
+    def first_at_least(self, x, start, stop):
+        """Primeiro i em [start, stop) com values[i] >= x, ou -1."""
+        stop = min(stop, self.n)
+        if start >= stop:
+            return -1
+
+        start += self._offset
+        stop += self._offset
+
+        # desce pelos níveis pulando blocos inteiros que não atingem o alvo;
+        # a distância até o primeiro acerto é "montada" bit a bit
+        pos = start
+        for k in range((stop - start).bit_length() - 1, -1, -1):
+            level = self._max[k]
+            if pos < len(level) and level[pos] < x:
+                pos += 1 << k
+                if pos >= stop:
+                    return -1
+
+        return pos - self._offset if self._max[0][pos] >= x else -1
+
+    def first_at_most(self, x, start, stop):
+        """Primeiro i em [start, stop) com values[i] <= x, ou -1."""
+        stop = min(stop, self.n)
+        if start >= stop:
+            return -1
+
+        start += self._offset
+        stop += self._offset
+
+        pos = start
+        for k in range((stop - start).bit_length() - 1, -1, -1):
+            level = self._min[k]
+            if pos < len(level) and level[pos] > x:
+                pos += 1 << k
+                if pos >= stop:
+                    return -1
+
+        return pos - self._offset if self._min[0][pos] <= x else -1
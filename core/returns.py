@@ -0,0 +1,12 @@
+import numpy as np
+
+def compute_returns(prices):
+    # garante vetor 1D
+    prices = np.asarray(prices, dtype=float).reshape(-1)
+
+    if len(prices) < 2:
+        return np.zeros_like(prices, dtype=float)
+
+    rets = (prices[1:] - prices[:-1]) / (prices[:-1] + 1e-12)
+    # primeiro retorno = 0 para alinhar tamanhos
+    return np.concatenate(([0.0], rets))
@@ -0,0 +1,88 @@
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# cada array começa num múltiplo de 64 bytes dentro do segmento
+_ALIGN = 64
+
+
+class SharedArrays:
+    """
+    Publica um conjunto de arrays NumPy num único segmento de
+    multiprocessing.shared_memory, para os workers lerem sem cópia.
+
+    O dono cria SharedArrays({"Px": ..., "Py": ...}) e manda só 'spec'
+    (nome do segmento + layout, poucos bytes) para os workers, que chamam
+    attach_arrays(spec) e recebem views somente-leitura. A memória dos
+    dados fica uma vez só na máquina, qualquer que seja o nº de workers.
+
+    Ciclo de vida: close() (ou sair do 'with') fecha e remove o segmento.
+    Se o dono esquecer, ele é removido quando o objeto é coletado ou o
+    interpretador termina (weakref.finalize); se o processo morrer de vez
+    (kill), o resource_tracker do multiprocessing remove o que sobrou.
+    """
+
+    def __init__(self, arrays):
+        layout = []
+        size = 0
+        for key, arr in arrays.items():
+            arr = np.asarray(arr)
+            size = -(-size // _ALIGN) * _ALIGN
+            layout.append((key, arr.dtype.str, arr.shape, size))
+            size += arr.nbytes
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+
+        for (key, dtype, shape, offset), arr in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype, buffer=self._shm.buf, offset=offset)[...] = arr
+
+        self.spec = {"name": self._shm.name, "layout": layout}
+
+    @property
+    def name(self):
+        return self.spec["name"]
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def close(self):
+        """Fecha e remove o segmento (idempotente)."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _release(shm):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass  # já removido (ex.: pelo resource_tracker)
+
+
+def attach_arrays(spec):
+    """
+    Abre (no worker) o segmento de um SharedArrays pelo 'spec'.
+
+    Retorna (segmento, {nome: view somente-leitura}); guarde o segmento
+    enquanto usar as views -- elas apontam para a memória dele.
+    """
+    try:
+        # Python >= 3.13: quem só lê não registra o segmento no resource_tracker
+        shm = shared_memory.SharedMemory(name=spec["name"], track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=spec["name"])
+
+    arrays = {}
+    for key, dtype, shape, offset in spec["layout"]:
+        view = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        arrays[key] = view
+    return shm, arrays
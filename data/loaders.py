@@ -1,19 +1,71 @@
-import yfinance as yf
 import numpy as np
 import pandas as pd
 
-def load_brazil_stocks(ticker_x, ticker_y, period="5y", interval="1d"):
-    X = yf.download(ticker_x, period=period, interval=interval)
-    Y = yf.download(ticker_y, period=period, interval=interval)
+from data.price_cache import load_close_many
 
-    if X.empty:
-        raise ValueError(f"Sem dados para {ticker_x}")
-    if Y.empty:
-        raise ValueError(f"Sem dados para {ticker_y}")
+def load_price_panel(
+    tickers,
+    period="10y",
+    interval="1d",
+    start=None,
+    auto_adjust=True,
+    offline=None,
+    cache_dir=None,
+):
+    """
+    Painel de fechamentos de N tickers alinhados num calendário comum.
+
+    Os preços vêm do cache local (data/price_cache.py), com no máximo uma
+    chamada em lote ao Yahoo para o que faltar. O alinhamento é um join
+    interno por data: só ficam os candles em que TODOS os tickers negociaram.
+
+    Retorna:
+      - prices: array (T, N) float64 contíguo, coluna j = tickers[j]
+      - dates:  DatetimeIndex (T,)
+    """
+    tickers = list(tickers)
+    series = load_close_many(
+        tickers,
+        period=period,
+        interval=interval,
+        start=start,
+        auto_adjust=auto_adjust,
+        offline=offline,
+        cache_dir=cache_dir,
+    )
+
+    for ticker in tickers:
+        if series[ticker].empty:
+            raise ValueError(f"Sem dados para {ticker}")
+
+    return align_panel(series, tickers)
 
-    # garante vetor 1D
-    px = X["Close"].to_numpy(dtype=float).reshape(-1)
-    py = Y["Close"].to_numpy(dtype=float).reshape(-1)
 
-    T = min(len(px), len(py))
-    return px[:T], py[:T]
\ No newline at end of file
+def align_panel(series, tickers):
+    """
+    Alinha {ticker: série} por data (join interno) num array (T, N)
+    contíguo + DatetimeIndex, na ordem de 'tickers'.
+    """
+    panel = pd.concat([series[t] for t in tickers], axis=1, join="inner", keys=tickers)
+    panel = panel.sort_index()
+
+    prices = np.ascontiguousarray(panel.to_numpy(dtype=float))
+    return prices, panel.index
+
+
+def load_brazil_stocks(ticker_x, ticker_y, period="5y", interval="1d", offline=None, cache_dir=None):
+    """
+    Fechamentos de X e Y alinhados por data (ver load_price_panel).
+    """
+    prices, _ = load_price_panel(
+        [ticker_x, ticker_y],
+        period=period,
+        interval=interval,
+        offline=offline,
+        cache_dir=cache_dir,
+    )
+
+    # garante vetor 1D
+    px = np.ascontiguousarray(prices[:, 0])
+    py = np.ascontiguousarray(prices[:, 1])
+    return px, py
\ No newline at end of file
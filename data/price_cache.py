@@ -0,0 +1,308 @@
+# data/price_cache.py
+"""
+Cache local de preços de fechamento (um arquivo colunar .npz por ticker,
+intervalo e tipo de ajuste), com atualização incremental.
+
+- Primeira chamada: baixa o período pedido do Yahoo e salva.
+- Chamadas seguintes: só baixa a partir dos dois últimos candles salvos
+  (o último é rebaixado, pode ter sido parcial) e acrescenta. Se o candle
+  completo da emenda mudou (preços ajustados recalculados após dividendo
+  ou desdobramento), o histórico inteiro é rebaixado em vez de emendado.
+- offline=True (ou PRICE_CACHE_OFFLINE=1): não toca na rede, serve só do
+  cache; erro se o ticker não estiver em cache.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.environ.get("PRICE_CACHE_DIR", ".price_cache")
+
+# folga para o início pedido cair num fim de semana/feriado
+_COVERAGE_SLACK = pd.Timedelta(days=7)
+
+# diferença relativa na emenda acima da qual o histórico em cache é
+# considerado de outra base de ajuste (proventos costumam passar de 0,1%)
+_SEAM_RTOL = 1e-4
+
+
+def extract_close(df, ticker):
+    """
+    Pega a série de fechamento ('Close', senão 'Adj Close') do DataFrame do
+    yfinance. Funciona tanto com colunas simples quanto com MultiIndex
+    (Price x Ticker). Num download em lote, um ticker que não veio no
+    DataFrame dá série vazia (nunca a coluna de outro ticker).
+    """
+    cols = df.columns
+
+    if isinstance(cols, pd.MultiIndex):
+        level0 = cols.get_level_values(0)
+        series = None
+
+        for name in ("Close", "Adj Close"):
+            if name in level0:
+                sub = df[name]
+                if isinstance(sub, pd.DataFrame):
+                    if ticker not in sub.columns:
+                        return pd.Series(dtype=float, name="Close")
+                    sub = sub[ticker]
+                series = sub
+                break
+
+        if series is None:
+            raise RuntimeError(
+                f"ERRO: Nenhuma coluna 'Close' ou 'Adj Close' encontrada em MultiIndex para {ticker}.\n"
+                f"Colunas: {cols}"
+            )
+    else:
+        if "Close" in cols:
+            series = df["Close"]
+        elif "Adj Close" in cols:
+            series = df["Adj Close"]
+        else:
+            raise RuntimeError(
+                f"ERRO: Nenhuma coluna 'Close' ou 'Adj Close' encontrada para {ticker}.\n"
+                f"Colunas: {list(cols)}"
+            )
+
+    return _normalize(series)
+
+
+def period_start(period, now=None):
+    """Converte períodos do yfinance ('10y', '180d', '6mo', 'max', ...) em data inicial."""
+    if period is None or period == "max":
+        return None
+
+    now = pd.Timestamp.now().normalize() if now is None else pd.Timestamp(now)
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if m is None:
+        raise ValueError(f"Período não reconhecido: {period!r}")
+
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "d":
+        return now - pd.DateOffset(days=n)
+    if unit == "wk":
+        return now - pd.DateOffset(weeks=n)
+    if unit == "mo":
+        return now - pd.DateOffset(months=n)
+    return now - pd.DateOffset(years=n)
+
+
+def cache_path(ticker, interval="1d", auto_adjust=True, cache_dir=None):
+    cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+    kind = "adj" if auto_adjust else "raw"
+    return os.path.join(cache_dir, f"{safe}_{interval}_{kind}.npz")
+
+
+def read_cache(path):
+    """Lê (série, coberto_desde) do cache; (None, None) se não existir."""
+    if not os.path.exists(path):
+        return None, None
+
+    with np.load(path) as data:
+        dates = pd.to_datetime(data["dates"])
+        close = data["close"]
+        covered_from = int(data["covered_from"])
+
+    series = pd.Series(close, index=dates, name="Close")
+    covered = None if covered_from == np.iinfo(np.int64).min else pd.Timestamp(covered_from)
+    return series, covered
+
+
+def write_cache(path, series, covered_from):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    covered = np.iinfo(np.int64).min if covered_from is None else pd.Timestamp(covered_from).value
+
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        dates=series.index.values.astype("datetime64[ns]").astype(np.int64),
+        close=series.to_numpy(dtype=float),
+        covered_from=np.int64(covered),
+    )
+    os.replace(tmp, path)  # troca atômica: nunca deixa um cache pela metade
+
+
+def load_close_series(
+    ticker,
+    period="10y",
+    interval="1d",
+    start=None,
+    auto_adjust=True,
+    offline=None,
+    cache_dir=None,
+):
+    """
+    Série de fechamento (pd.Series indexada por data, sem NaN) vinda do
+    cache local, baixando do Yahoo só o que faltar.
+
+    'start' (data) tem prioridade sobre 'period'. offline=None usa a
+    variável de ambiente PRICE_CACHE_OFFLINE.
+    """
+    series = load_close_many(
+        [ticker],
+        period=period,
+        interval=interval,
+        start=start,
+        auto_adjust=auto_adjust,
+        offline=offline,
+        cache_dir=cache_dir,
+    )[ticker]
+    if series.empty:
+        raise RuntimeError(f"ERRO: Yahoo Finance retornou DataFrame vazio para {ticker}.")
+    return series
+
+
+def load_close_many(
+    tickers,
+    period="10y",
+    interval="1d",
+    start=None,
+    auto_adjust=True,
+    offline=None,
+    cache_dir=None,
+):
+    """
+    Como load_close_series, para vários tickers: {ticker: série}.
+
+    Os tickers que precisam de rede são agrupados em no máximo duas
+    chamadas em lote ao Yahoo: uma para quem precisa do período inteiro e
+    outra, incremental, para quem já está em cache.
+
+    Um ticker sem cache que o Yahoo devolve vazio (ex.: deslistado) vem
+    como série vazia e não é gravado; quem chama decide se descarta.
+    """
+    if offline is None:
+        offline = os.environ.get("PRICE_CACHE_OFFLINE", "") not in ("", "0")
+
+    want_from = pd.Timestamp(start) if start is not None else period_start(period)
+
+    cached = {}
+    full, incremental = [], []
+    for ticker in tickers:
+        path = cache_path(ticker, interval, auto_adjust, cache_dir)
+        series, covered = read_cache(path)
+        cached[ticker] = (path, series, covered)
+
+        if offline:
+            if series is None:
+                raise RuntimeError(f"ERRO: {ticker} ({interval}) não está no cache {path} (modo offline).")
+            continue
+
+        covers = series is not None and not series.empty and (
+            covered is None or (want_from is not None and covered <= want_from + _COVERAGE_SLACK)
+        )
+        (incremental if covers else full).append(ticker)
+
+    fresh = {}
+    if full:
+        if want_from is None:
+            fresh.update(_download(full, interval, auto_adjust, period="max"))
+        elif start is not None:
+            fresh.update(_download(full, interval, auto_adjust, start=want_from))
+        else:
+            fresh.update(_download(full, interval, auto_adjust, period=period))
+    replaced = set()
+    if incremental:
+        # rebaixa a partir do penúltimo candle salvo (o mais antigo do
+        # grupo): o último pode ter sido parcial, o penúltimo serve de emenda
+        since = min(cached[t][1].index[-2:][0].normalize() for t in incremental)
+        fresh.update(_download(incremental, interval, auto_adjust, start=since))
+
+        # ajuste mudou desde o cache: emendar criaria um salto falso
+        refetch = [t for t in incremental if not _same_adjustment(cached[t][1], fresh[t])]
+        if refetch:
+            print(f"[INFO] Preços ajustados mudaram (proventos?): rebaixando o histórico de {refetch}")
+            starts = [cached[t][2] for t in refetch]
+            if any(c is None for c in starts):
+                redo = _download(refetch, interval, auto_adjust, period="max")
+            else:
+                redo = _download(refetch, interval, auto_adjust, start=min(starts))
+            for t in refetch:
+                if redo[t].empty:
+                    del fresh[t]  # sem resposta: fica com o cache antigo, sem emendar
+                else:
+                    fresh[t] = redo[t]
+                    replaced.add(t)
+
+    out = {}
+    for ticker in tickers:
+        path, series, covered = cached[ticker]
+
+        if ticker in fresh:
+            new = fresh[ticker]
+            if new.empty and series is None:
+                out[ticker] = new
+                continue
+
+            if ticker in full:
+                # download completo: a cobertura passa a começar em want_from
+                if covered is not None and want_from is not None:
+                    covered = min(covered, want_from)
+                else:
+                    covered = want_from
+
+            series = new if series is None or ticker in replaced else _merge(series, new)
+            write_cache(path, series, covered)
+
+        out[ticker] = _slice_from(series, want_from)
+
+    return out
+
+
+def _download(tickers, interval, auto_adjust, period=None, start=None):
+    """Uma única chamada ao yfinance para todos os tickers: {ticker: série}."""
+    import yfinance as yf
+
+    df = yf.download(
+        list(tickers),
+        period=period,
+        start=start,
+        interval=interval,
+        auto_adjust=auto_adjust,
+        progress=False,
+    )
+    if df is None or df.empty:
+        return {t: pd.Series(dtype=float, name="Close") for t in tickers}
+    return {t: extract_close(df, t) for t in tickers}
+
+
+def _normalize(series):
+    series = pd.Series(series.to_numpy(dtype=float).reshape(-1), index=series.index, name="Close")
+    series = series.dropna()
+    if series.index.tz is not None:
+        series.index = series.index.tz_localize(None)
+    return series
+
+
+def _merge(old, new):
+    if new.empty:
+        return old
+    # candles novos substituem os antigos na mesma data
+    series = pd.concat([old, new])
+    series = series[~series.index.duplicated(keep="last")]
+    return series.sort_index()
+
+
+def _same_adjustment(old, new):
+    """
+    O download incremental 'new' está na mesma base de ajuste do cache
+    'old'? Compara os candles em comum, menos o último do cache (que pode
+    ter sido parcial). Sem candle em comum não há o que comparar.
+    """
+    common = old.index[:-1].intersection(new.index)
+    if common.empty:
+        return True
+    return np.allclose(new[common].to_numpy(), old[common].to_numpy(), rtol=_SEAM_RTOL, atol=0.0)
+
+
+def _slice_from(series, start):
+    if start is None:
+        return series
+    return series[series.index >= start]
@@ -0,0 +1,64 @@
+# evolution/cache.py
+
+from collections import OrderedDict
+
+GENE_KEYS = ("threshold", "tp", "sl", "lag", "max_hold")
+
+
+class FitnessCache:
+    """
+    Cache LRU (limitado) de avaliações de genoma.
+
+    A chave é o genoma quantizado (floats arredondados em 'decimals' casas,
+    lag/max_hold inteiros) + a impressão digital dos dados + a taxa, então
+    genomas que colapsaram para o mesmo ponto (crossover por média, clamp
+    nos limites) só são avaliados uma vez por dataset.
+
+    hits/misses acumulam até take_counters() ser chamado.
+    """
+
+    def __init__(self, maxsize=4096, decimals=10):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # só consulta: não mexe nos contadores nem na ordem do LRU
+        return key in self._data
+
+    def key(self, genome, fingerprint, fee):
+        genes = tuple(
+            int(genome[k]) if k in ("lag", "max_hold") else round(float(genome[k]), self.decimals)
+            for k in GENE_KEYS
+        )
+        return genes, fingerprint, float(fee)
+
+    def get(self, key):
+        """Devolve a avaliação guardada (ou None) e atualiza os contadores."""
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def take_counters(self):
+        """Retorna (hits, misses) desde a última chamada e zera."""
+        counters = (self.hits, self.misses)
+        self.hits = 0
+        self.misses = 0
+        return counters
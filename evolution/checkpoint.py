@@ -0,0 +1,102 @@
+# evolution/checkpoint.py
+
+import json
+import os
+
+import numpy as np
+
+# escalares do estado do GA (ver evolution.ga.new_ga_state) que vão no JSON
+_SCALAR_KEYS = (
+    "params",
+    "generation",
+    "history",
+    "mutation_rate",
+    "count_stagnation",
+    "count_genocide",
+    "count_plateau",
+    "stopped",
+    "best_prev",
+    "best_of_best_fit",
+    "genocide_toggle",
+    "race_stats",
+)
+
+# arrays do .npz (ver save_ga_checkpoint)
+_ARRAY_KEYS = ("population", "fitness", "best_of_best", "archive_X", "archive_y", "meta")
+
+
+def _to_jsonable(value):
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)  # float -> JSON -> float é exato
+    return value
+
+
+def save_ga_checkpoint(state, path, fingerprint=None):
+    """
+    Salva o estado do GA num .npz compacto: população, fitness,
+    best_of_best e o arquivo do surrogate como arrays; contadores, taxa de mutação, histórico,
+    avaliações e a raiz dos streams de sorteio (entropia e spawn_key da
+    SeedSequence) num JSON embutido. A escrita é atômica (arquivo temporário + os.replace).
+
+    'fingerprint' (do PreparedMarketData) vai junto para o resume conferir
+    que os dados são os mesmos.
+    """
+    meta = {k: state[k] for k in _SCALAR_KEYS}
+    meta["evals"] = state["evals"]
+    seed_seq = state["seed_seq"]
+    meta["seed_seq"] = {"entropy": seed_seq.entropy, "spawn_key": list(seed_seq.spawn_key)}
+    meta["fingerprint"] = fingerprint
+
+    best_of_best = state["best_of_best"]
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        population=state["population"],
+        fitness=state["fitness"],
+        best_of_best=np.empty(0) if best_of_best is None else best_of_best,
+        archive_X=state["archive_X"],
+        archive_y=state["archive_y"],
+        meta=np.array(json.dumps(_to_jsonable(meta))),
+    )
+    os.replace(tmp, path)
+
+
+def load_ga_checkpoint(path):
+    """
+    Lê um checkpoint de save_ga_checkpoint. Retorna (state, fingerprint);
+    o estado continua exatamente de onde parou com step_ga. Checkpoints de
+    versões antigas do GA (sem algum array, ou com um gerador só em vez de
+    streams por slot) dão ValueError.
+    """
+    with np.load(path) as data:
+        missing = [k for k in _ARRAY_KEYS if k not in data.files]
+        if missing:
+            raise ValueError(f"checkpoint {path} é de uma versão antiga do GA (sem {', '.join(missing)})")
+        meta = json.loads(str(data["meta"]))
+        if "seed_seq" not in meta:
+            raise ValueError(f"checkpoint {path} é de uma versão antiga do GA")
+        population = data["population"].copy()
+        fitness = data["fitness"].copy()
+        best_of_best = data["best_of_best"].copy()
+        archive_X = data["archive_X"].copy()
+        archive_y = data["archive_y"].copy()
+
+    seed_seq = meta.pop("seed_seq")
+    fingerprint = meta.pop("fingerprint")
+
+    state = dict(meta)
+    state["seed_seq"] = np.random.SeedSequence(seed_seq["entropy"], spawn_key=tuple(seed_seq["spawn_key"]))
+    state["population"] = population
+    state["fitness"] = fitness
+    state["best_of_best"] = best_of_best if len(best_of_best) else None
+    state["archive_X"] = archive_X
+    state["archive_y"] = archive_y
+    return state, fingerprint
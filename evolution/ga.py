@@ -1,10 +1,25 @@
-import random
-import numpy as np
+import hashlib
+import os
 
-from core.leadlag import backtest_lead_lag
-from evolution.genome import random_genome, mutate, crossover
+import numpy as np
 
-import copy
+from core.leadlag import backtest_lead_lag, backtest_lead_lag_events
+from core.market import PreparedMarketData
+from evolution.cache import FitnessCache
+from evolution.checkpoint import load_ga_checkpoint, save_ga_checkpoint
+from evolution.genome import (
+    LOWER,
+    UPPER,
+    array_to_genomes,
+    crossover_population,
+    draw_rows,
+    fix_population,
+    mutate_population,
+    random_population,
+    row_to_genome,
+    slot_rngs,
+)
+from evolution.parallel import check_evaluation_pool, evaluate_many, make_evaluation_pool
 
 def max_drawdown(equity_curve):
     """
@@ -52,14 +67,19 @@ def sortino_ratio(equity_curve):
     if len(rets) < 2:
         return 0.0
 
-    mean_ret = np.mean(rets)
     neg_rets = rets[rets < 0]
+    downside_std = np.std(neg_rets) if len(neg_rets) else 0.0
+    return _sortino_from_moments(len(rets), np.mean(rets), len(neg_rets), downside_std)
+
+
+def _sortino_from_moments(n_returns, mean_ret, n_neg, downside_std):
+    if n_returns < 2:
+        return 0.0
 
-    if len(neg_rets) == 0:
+    if n_neg == 0:
         # nunca teve retorno negativo -> bom demais; limita pra não explodir
         return 5.0
 
-    downside_std = np.std(neg_rets)
     if downside_std < 1e-12:
         return 0.0
 
@@ -80,31 +100,22 @@ def calmar_ratio(total_return_pct, mdd_pct, n_periods, periods_per_year=252):
     return ann_ret / abs(mdd_pct)
 
 
-def windowed_consistency(equity_curve, n_windows=3):
-    """
-    Divide a curva em 'n_windows' blocos e mede o retorno em cada.
-    Penaliza se alguma janela for muito pior que a média.
-    """
-    equity = np.array(equity_curve, dtype=float)
-    n = len(equity)
+def _window_bounds(n, n_windows=3):
+    """Blocos [start, end) usados por windowed_consistency (só os com >= 2 pontos)."""
     if n < n_windows + 1:
-        return [], 0.0
+        return []
 
     window_size = n // n_windows
-    window_returns = []
-
+    bounds = []
     for i in range(n_windows):
         start = i * window_size
         end = (i + 1) * window_size if i < n_windows - 1 else n
+        if end - start >= 2:
+            bounds.append((start, end))
+    return bounds
 
-        if end - start < 2:
-            continue
-
-        eq_start = equity[start]
-        eq_end = equity[end - 1]
-        ret = (eq_end / (eq_start + 1e-12) - 1.0) * 100.0
-        window_returns.append(ret)
 
+def _consistency_penalty(window_returns):
     if not window_returns:
         return [], 0.0
 
@@ -118,28 +129,189 @@ def windowed_consistency(equity_curve, n_windows=3):
     return window_returns, penalty
 
 
-def evaluate_genome(genome, Px, Py, fee=0.0005):
+def windowed_consistency(equity_curve, n_windows=3):
+    """
+    Divide a curva em 'n_windows' blocos e mede o retorno em cada.
+    Penaliza se alguma janela for muito pior que a média.
+    """
+    equity = np.array(equity_curve, dtype=float)
+    window_returns = [
+        (equity[end - 1] / (equity[start] + 1e-12) - 1.0) * 100.0
+        for start, end in _window_bounds(len(equity), n_windows)
+    ]
+    return _consistency_penalty(window_returns)
+
+
+def risk_metrics(equity, n_windows=3, total_return_pct=None, periods_per_year=252):
+    """
+    Métricas de risco numa passada só sobre a curva de patrimônio:
+    equivalente a max_drawdown, sortino_ratio, calmar_ratio e
+    windowed_consistency, mas convertendo e varrendo a curva uma vez.
+
+    'equity' pode ser 1-D (uma curva, T) ou 2-D (genomas x tempo): no 2-D
+    as reduções sobre o tempo saem numa chamada para a população toda e
+    cada chave vem como array com uma posição por linha. Sem
+    'total_return_pct', o retorno total é medido na própria curva.
+
+    Retorna dict com mdd_pct, sortino, calmar, window_returns e cons_penalty.
+    """
+    equity = np.asarray(equity, dtype=float)
+    single = equity.ndim == 1
+    eq = np.atleast_2d(equity)
+    G, n = eq.shape
+
+    # drawdown (contas in-place para não alocar uma cópia por métrica)
+    peaks = np.maximum.accumulate(eq, axis=1)
+    dd = eq - peaks
+    peaks += 1e-12
+    dd /= peaks
+    mdd = (dd.min(axis=1) * 100.0).tolist()
+
+    # retornos passo a passo (reaproveita o buffer do drawdown) e momentos
+    # dos negativos, sem cópia mascarada
+    if n - 1 >= 2:
+        rets = np.subtract(eq[:, 1:], eq[:, :-1], out=dd[:, 1:])
+        rets /= eq[:, :-1] + 1e-12
+        is_neg = rets < 0
+        n_neg = is_neg.sum(axis=1)
+        mean_ret = (rets.sum(axis=1) / (n - 1)).tolist()  # mesma conta do np.mean
+        neg = np.minimum(rets, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            neg_mean = neg.sum(axis=1) / n_neg
+            neg -= neg_mean[:, None]
+            neg *= is_neg
+            downside_std = np.sqrt(np.einsum("ij,ij->i", neg, neg) / n_neg).tolist()
+        n_neg = n_neg.tolist()
+    else:
+        mean_ret, n_neg, downside_std = [0.0] * G, [0] * G, [0.0] * G
+
+    if total_return_pct is None:
+        total_return_pct = (eq[:, -1] / eq[:, 0] - 1.0) * 100.0
+    total_ret = np.broadcast_to(np.asarray(total_return_pct, dtype=float), (G,)).tolist()
+
+    windows = _window_bounds(n, n_windows)
+    starts = [start for start, _ in windows]
+    lasts = [end - 1 for _, end in windows]
+    window_returns = (eq[:, lasts] / (eq[:, starts] + 1e-12) - 1.0) * 100.0
+
+    # o resto é escalar por linha, com as mesmas funções das métricas avulsas
+    sortino, calmar, cons_penalty = [], [], []
+    for i in range(G):
+        sortino.append(_sortino_from_moments(n - 1, mean_ret[i], n_neg[i], downside_std[i]))
+        calmar.append(calmar_ratio(total_ret[i], mdd[i], n, periods_per_year))
+        cons_penalty.append(_consistency_penalty(window_returns[i].tolist())[1])
+
+    if single:
+        return {
+            "mdd_pct": mdd[0],
+            "sortino": sortino[0],
+            "calmar": calmar[0],
+            "window_returns": window_returns[0].tolist(),
+            "cons_penalty": cons_penalty[0],
+        }
+
+    return {
+        "mdd_pct": np.array(mdd),
+        "sortino": np.array(sortino),
+        "calmar": np.array(calmar),
+        "window_returns": window_returns,
+        "cons_penalty": np.array(cons_penalty),
+    }
+
+
+def evaluate_genome(genome, Px, Py, fee=0.0005, market=None, full=True):
     """
     Avalia um indivíduo de forma mais "profissional".
+
+    Se 'market' (PreparedMarketData) for passado, usa o backtest por
+    eventos sobre os dados já preparados e ignora Px/Py.
+
+    full=False (só com 'market'): caminho rápido do GA -- as métricas vêm
+    agregadas do backtest (mode="metrics"), sem montar curva nem lista de
+    trades, e o retorno não traz "result". O fitness é o mesmo do full=True.
     """
-    res = backtest_lead_lag(
-        Px, Py,
+    if market is not None and not full:
+        return _evaluate_metrics_only(genome, market, fee)
+
+    if market is not None:
+        res = backtest_lead_lag_events(
+            None, None,
+            threshold=genome["threshold"],
+            lag=genome["lag"],
+            tp=genome["tp"],
+            sl=genome["sl"],
+            max_hold=genome["max_hold"],
+            fee=fee,
+            market=market,
+            return_equity=True,
+        )
+    else:
+        res = backtest_lead_lag(
+            Px, Py,
+            threshold=genome["threshold"],
+            lag=genome["lag"],
+            tp=genome["tp"],
+            sl=genome["sl"],
+            max_hold=genome["max_hold"],
+            fee=fee
+        )
+
+    total_ret = res["total_return_pct"]          # %
+    # drawdown, Sortino, Calmar e consistência por janelas numa passada
+    risk = risk_metrics(res["equity_curve"], n_windows=3, total_return_pct=total_ret)
+    n_trades = len(res["trades"])
+
+    return _fitness_summary(
+        total_ret, risk["mdd_pct"], risk["calmar"], risk["sortino"], n_trades,
+        risk["window_returns"], risk["cons_penalty"], res,
+    )
+
+
+def _evaluate_metrics_only(genome, market, fee, resume=None, snapshot=False):
+    """
+    evaluate_genome sem materializar curva/trades (ver full=False).
+
+    resume: snapshot do backtest numa janela com o mesmo início (ex.: um
+    prefixo mais curto); o backtest continua dele em vez de começar do
+    candle 0, com o mesmo resultado. snapshot=True devolve
+    (avaliação, snapshot do último candle reaproveitável desta janela).
+    """
+    windows = _window_bounds(len(market), n_windows=3)
+    last = len(market) - max(int(genome["lag"]), 1)
+    if resume is not None and resume["t"] > last:
+        resume = None
+    res = backtest_lead_lag_events(
+        None, None,
         threshold=genome["threshold"],
         lag=genome["lag"],
         tp=genome["tp"],
         sl=genome["sl"],
         max_hold=genome["max_hold"],
-        fee=fee
+        fee=fee,
+        market=market,
+        mode="metrics",
+        checkpoints=[t for w in windows for t in (w[0], w[1] - 1)],
+        snapshot_at=[last] if snapshot else (),
+        resume=resume,
     )
+    m = res["metrics"]
+    eq = m["checkpoints"]
 
-    total_ret = res["total_return_pct"]          # %
-    equity_curve = res["equity_curve"]
-    n_periods = len(equity_curve)
-    mdd = max_drawdown(equity_curve)             # %
-    calmar = calmar_ratio(total_ret, mdd, n_periods)
-    sortino = sortino_ratio(equity_curve)
-    n_trades = len(res["trades"])
+    total_ret = res["total_return_pct"]
+    mdd = m["mdd_pct"]
+    calmar = calmar_ratio(total_ret, mdd, res["n_periods"])
+    sortino = _sortino_from_moments(m["n_returns"], m["mean_return"], m["n_neg"], m["neg_std"])
+    window_returns, cons_penalty = _consistency_penalty([
+        (eq[end - 1] / (eq[start] + 1e-12) - 1.0) * 100.0 for start, end in windows
+    ])
+
+    summary = _fitness_summary(total_ret, mdd, calmar, sortino, res["n_trades"], window_returns, cons_penalty)
+    if snapshot:
+        return summary, (res["snapshots"][0] if res["snapshots"] else None)
+    return summary
 
+
+def _fitness_summary(total_ret, mdd, calmar, sortino, n_trades, window_returns, cons_penalty, res=None):
     # Penalidade por nº de trades ruim
     MIN_TRADES = 15
     MAX_TRADES = 400
@@ -149,9 +321,6 @@ def evaluate_genome(genome, Px, Py, fee=0.0005):
     if n_trades > MAX_TRADES:
         trade_penalty += (n_trades - MAX_TRADES) * 0.1
 
-    # Consistência por janelas
-    window_returns, cons_penalty = windowed_consistency(equity_curve, n_windows=3)
-
     # Combinação do fitness
     fitness = (
         #2.0 * calmar +      # Calmar pesa mais
@@ -161,7 +330,7 @@ def evaluate_genome(genome, Px, Py, fee=0.0005):
         #- cons_penalty
     )
 
-    return {
+    summary = {
         "fitness": fitness,
         "total_return_pct": total_ret,
         "mdd_pct": mdd,
@@ -171,17 +340,108 @@ def evaluate_genome(genome, Px, Py, fee=0.0005):
         "window_returns": window_returns,
         "trade_penalty": trade_penalty,
         "cons_penalty": cons_penalty,
-        "result": res,
     }
+    if res is not None:
+        summary["result"] = res
+    return summary
 
 
-def tournament_selection(population, k=3):
+def _evaluate_batch(genomes, market, fee, cache, executor=None, resumes=None):
     """
-    Seleção por torneio: sorteia k e pega o de maior fitness.
+    Avalia uma lista de genomas (na ordem), passando pelo cache LRU.
+
+    Só os genomas que não estão no cache são avaliados, uma vez cada
+    (repetidos dentro do mesmo lote contam como hit), em série ou no pool.
+
+    resumes (lista paralela a genomes, snapshot ou None): cada backtest
+    retoma do seu snapshot (ver _evaluate_metrics_only) e o retorno vira
+    (avaliações, snapshots desta janela); hits do cache vêm sem snapshot.
     """
-    competitors = random.sample(population, k)
-    competitors.sort(key=lambda ind: ind["fitness"], reverse=True)
-    return competitors[0]
+    keys = [None] * len(genomes)
+    results = [None] * len(genomes)
+    pending = {}  # chave -> posições no lote
+
+    for i, g in enumerate(genomes):
+        if cache is None:
+            pending[i] = [i]
+            continue
+        key = cache.key(g, market.fingerprint, fee)
+        keys[i] = key
+        if key in pending:
+            pending[key].append(i)
+            cache.hits += 1
+            continue
+        results[i] = cache.get(key)
+        if results[i] is None:
+            pending[key] = [i]
+
+    todo = [genomes[slots[0]] for slots in pending.values()]
+    snapshots = [None] * len(genomes)
+    if resumes is not None:
+        todo_resumes = [resumes[slots[0]] for slots in pending.values()]
+        if executor is not None:
+            evaluated = evaluate_many(todo, market, fee, executor, resumes=todo_resumes)
+        else:
+            evaluated = [
+                _evaluate_metrics_only(g, market, fee, resume=r, snapshot=True)
+                for g, r in zip(todo, todo_resumes)
+            ]
+        for slots, (_, snap) in zip(pending.values(), evaluated):
+            for i in slots:
+                snapshots[i] = snap
+        evaluated = [eval_res for eval_res, _ in evaluated]
+    elif executor is not None:
+        evaluated = evaluate_many(todo, market, fee, executor)
+    else:
+        evaluated = [evaluate_genome(g, None, None, fee, market=market, full=False) for g in todo]
+
+    for slots, eval_res in zip(pending.values(), evaluated):
+        if cache is not None:
+            cache.put(keys[slots[0]], eval_res)
+        for i in slots:
+            results[i] = eval_res
+
+    if resumes is not None:
+        return results, snapshots
+    return results
+
+
+def tournament_selection(fitness, k, n, rng):
+    """
+    Seleção por torneio, n torneios de uma vez: cada um sorteia k índices
+    distintos e fica com o de maior fitness (empate -> menor índice).
+
+    Todos os competidores saem de um sorteio só (linhas com repetição são
+    ressorteadas); devolve os n índices vencedores. 'rng' é um Generator
+    ou uma lista de n geradores, um por torneio (ver slot_rngs).
+    """
+    N = len(fitness)
+    k = min(k, N)
+
+    competitors = draw_rows(rng, n, "integers", 0, N, size=(k,))
+    while True:
+        competitors.sort(axis=1)
+        dup = (competitors[:, 1:] == competitors[:, :-1]).any(axis=1)
+        if not dup.any():
+            break
+        redraw = rng if isinstance(rng, np.random.Generator) else [rng[i] for i in np.flatnonzero(dup)]
+        competitors[dup] = draw_rows(redraw, int(dup.sum()), "integers", 0, N, size=(k,))
+
+    winners = np.argmax(fitness[competitors], axis=1)
+    return competitors[np.arange(n), winners]
+
+
+def select_elites(fitness, n_elite):
+    """
+    Índices dos n_elite maiores fitness, do melhor para o pior, via
+    np.argpartition (sem ordenar a população inteira).
+    """
+    N = len(fitness)
+    if n_elite >= N:
+        idx = np.arange(N)
+    else:
+        idx = np.argpartition(-fitness, n_elite - 1)[:n_elite]
+    return idx[np.lexsort((idx, -fitness[idx]))]
 
 
 def run_ga(
@@ -192,147 +452,711 @@ def run_ga(
     mutation_rate=1,
     tournament_size=3,
     fee=0.0005,
-    seed=42
+    seed=42,
+    market=None,
+    cache_size=4096,
+    fitness_cache=None,
+    n_workers=None,
+    executor=None,
+    checkpoint_path=None,
+    checkpoint_every=10,
+    race_rungs=None,
+    race_eta=2,
+    race_audit_every=0,
+    race_fill="elites",
+    surrogate_pool=0,
+    surrogate_explore=0.2,
+    surrogate_k=7,
+    early_stop=None,
+    initial_population=None,
+    return_state=False,
 ):
     """
     Roda o Algoritmo Genético para otimizar os parâmetros.
+
+    Os dados são preparados uma única vez (PreparedMarketData) e
+    compartilhados por todas as avaliações; passe 'market' para reaproveitar
+    uma preparação já feita (Px/Py são ignorados nesse caso).
+
+    Avaliações passam por um cache LRU de até 'cache_size' genomas
+    (0 desliga); passe 'fitness_cache' para compartilhar um FitnessCache
+    entre execuções. Hits/misses são mostrados a cada geração.
+
+    Paralelismo (opcional): n_workers > 1 cria um pool de processos só para
+    esta execução; 'executor' reaproveita um pool criado com
+    make_evaluation_pool(market) sobre o mesmo dataset (conferido pelo
+    fingerprint; outro dataset dá ValueError). Cada indivíduo é
+    sorteado pelo seu próprio stream (SeedSequence(seed) + geração + slot,
+    ver new_ga_state), então o resultado é bit a bit o mesmo com 1 ou 64
+    workers, para a mesma seed.
+
+    Checkpoint (opcional): com 'checkpoint_path' (.npz) o estado completo
+    do GA (população, fitness, best_of_best, contadores, taxa de mutação,
+    raiz dos streams de sorteio) é salvo a cada 'checkpoint_every' gerações e no fim.
+    Se o arquivo já existir com os mesmos parâmetros e dados, a execução
+    continua de onde parou e termina idêntica a uma execução sem parada.
+
+    Corrida (opcional): com race_rungs=(0.25, 0.5), por exemplo, os filhos
+    são avaliados primeiro em 25% e 50% dos dados e a cada etapa só a
+    metade melhor (race_eta=2) segue; só os sobreviventes passam pelo
+    backtest completo e os descartados não entram na população. Com
+    race_fill="elites" (padrão) as vagas dos descartados ficam com os
+    próximos melhores da população atual: a geração custa menos que sem
+    corrida, mas a população se renova menos. race_fill="candidates"
+    sorteia race_eta ** nº de etapas vezes mais filhos, para os
+    sobreviventes preencherem todas as vagas -- renova como sem corrida,
+    mas custa MAIS que sem corrida (~3x com os valores do exemplo). O
+    orçamento usado (só avaliações fora do cache) é mostrado no fim contra
+    o de uma geração sem corrida (uma avaliação completa por vaga de
+    filho), junto com a concordância de ranking.
+
+    Surrogate (opcional): com surrogate_pool=4, por exemplo, cada geração
+    gera 4x mais filhos candidatos, um k-NN (surrogate_k vizinhos) sobre o
+    arquivo de todos os genomas já avaliados estima o fitness de cada um e
+    só os mais promissores vão para o backtest; uma fração
+    'surrogate_explore' das vagas é sorteada entre os demais.
+
+    Early stop (opcional): com early_stop=K o GA para depois de K gerações
+    seguidas sem melhora do melhor global (history fica mais curto).
+    'initial_population' (matriz N x 5 de genes, ex.: a elite de outra
+    execução) semeia a população inicial; o resto é aleatório.
+
     Retorna:
       - best_individual
       - history (melhor fitness por geração)
+      - state (só com return_state=True): estado final do GA (ver new_ga_state)
     """
-    random.seed(seed)
-    np.random.seed(seed)
-
-    # 1) População inicial
-    population = []
-    for _ in range(population_size):
-        g = random_genome()
-        eval_res = evaluate_genome(g, Px, Py, fee)
-        population.append({
-            "genome": g,
-            **eval_res,
-        })
-
-    history = []
-
-
+    if market is None:
+        market = PreparedMarketData(Px, Py)
+
+    cache = fitness_cache
+    if cache is None and cache_size > 0:
+        cache = FitnessCache(maxsize=cache_size)
+
+    own_executor = executor is None and n_workers is not None and n_workers > 1
+    if own_executor:
+        executor = make_evaluation_pool(market, n_workers)
+    elif executor is not None:
+        check_evaluation_pool(executor, market)
+
+    ga_kwargs = {
+        "population_size": population_size,
+        "generations": generations,
+        "elite_frac": elite_frac,
+        "mutation_rate": mutation_rate,
+        "tournament_size": tournament_size,
+        "fee": fee,
+        "seed": seed,
+        "race_rungs": [float(f) for f in race_rungs] if race_rungs else None,
+        "race_eta": race_eta,
+        "race_audit_every": race_audit_every,
+        "race_fill": race_fill,
+        "surrogate_pool": surrogate_pool,
+        "surrogate_explore": surrogate_explore,
+        "surrogate_k": surrogate_k,
+        "early_stop": early_stop,
+    }
 
-       # ---- CONTROLES ----
-    DELTA = 1e-6
-    count_stagnation = 0          # controla a mutação adaptativa (como você já fez)
-    count_genocide = 0            # controla o genocídio (NOVO, separado)
-    best_prev = None
-    mutation_rate_original = mutation_rate
-    MUT_MAX = 0.8
+    try:
+        state = None
+        if checkpoint_path is not None:
+            seeded_params = {**ga_kwargs, "initial_population": _population_digest(initial_population)}
+            state = _resume_ga(checkpoint_path, market, seeded_params)
+        if state is None:
+            state = new_ga_state(
+                market, initial_population=initial_population, cache=cache, executor=executor, **ga_kwargs
+            )
+
+        if checkpoint_path is None:
+            step_ga(state, market, generations - state["generation"], cache=cache, executor=executor)
+        else:
+            while True:
+                save_ga_checkpoint(state, checkpoint_path, market.fingerprint)
+                remaining = generations - state["generation"]
+                if remaining <= 0 or state["stopped"]:
+                    break
+                step_ga(state, market, min(checkpoint_every, remaining), cache=cache, executor=executor)
+
+        if race_rungs:
+            print(race_report(state["race_stats"]))
+
+        if return_state:
+            return ga_best(state, market), state["history"], state
+        return ga_best(state, market), state["history"]
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def _resume_ga(path, market, ga_kwargs):
+    """Estado salvo em 'path', se existir e bater com parâmetros e dados."""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        state, fingerprint = load_ga_checkpoint(path)
+    except ValueError as exc:
+        print(f"[INFO] {exc}; começando do zero.")
+        return None
+    if (
+        state["params"] != ga_kwargs
+        or fingerprint != market.fingerprint
+        or state["race_stats"].keys() != new_race_stats().keys()
+    ):
+        print(f"[INFO] Checkpoint {path} é de outra configuração; começando do zero.")
+        return None
+
+    print(f"[INFO] Retomando do checkpoint {path} (geração {state['generation']}).")
+    return state
+
+
+def _population_digest(population):
+    """Hash (formato + genes) da initial_population, None sem ela; vai nos params do checkpoint."""
+    if population is None:
+        return None
+    population = np.ascontiguousarray(population, dtype=float)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(population.shape).encode())
+    h.update(population.tobytes())
+    return h.hexdigest()
+
+
+# ---- CONTROLES ----
+# endereço (etapa, geração, slot) de cada stream de sorteio (ver slot_rngs)
+STREAM_INIT, STREAM_CHILD, STREAM_GENOCIDE, STREAM_SCREEN = range(4)
+
+# quem fica com as vagas dos filhos descartados pela corrida (ver run_ga)
+RACE_FILLS = ("candidates", "elites")
+
+DELTA = 1e-6          # melhora mínima para não contar como estagnação
+MUT_MAX = 0.8
+GENOCIDE_STAG = 30    # qtas gerações SEM melhorar pra ativar genocídio
+
+
+def _evaluate_population(pop, market, fee, cache, executor, resumes=None):
+    if resumes is not None:
+        evals, snapshots = _evaluate_batch(array_to_genomes(pop), market, fee, cache, executor, resumes)
+        return evals, np.array([e["fitness"] for e in evals], dtype=float), snapshots
+    evals = _evaluate_batch(array_to_genomes(pop), market, fee, cache, executor)
+    return evals, np.array([e["fitness"] for e in evals], dtype=float)
+
+
+def new_ga_state(
+    market,
+    population_size=150,
+    generations=60,
+    elite_frac=0.2,
+    mutation_rate=1,
+    tournament_size=3,
+    fee=0.0005,
+    seed=42,
+    race_rungs=None,
+    race_eta=2,
+    race_audit_every=0,
+    race_fill="elites",
+    surrogate_pool=0,
+    surrogate_explore=0.2,
+    surrogate_k=7,
+    early_stop=None,
+    initial_population=None,
+    cache=None,
+    executor=None,
+    seed_seq=None,
+):
+    """
+    Estado do GA entre gerações (ver step_ga): população inicial já
+    avaliada, a raiz dos streams de sorteio e os controles de estagnação,
+    mutação adaptativa e genocídio.
+
+    A população é uma matriz (N x 5) de genes (ver evolution.genome) com
+    os vetores paralelos "fitness" e "evals" (avaliação de cada linha).
+
+    Sorteio: cada indivíduo usa o seu próprio np.random.Generator, derivado
+    de 'seed_seq' (padrão: SeedSequence(seed)) pelo endereço (etapa,
+    geração, slot) -- ver slot_rngs. O resultado só depende da seed, nunca
+    da ordem ou do lugar (processo, worker) em que as avaliações rodam.
+
+    race_rungs (ex.: (0.25, 0.5)) liga a corrida dos filhos em prefixos
+    dos dados; ver _race_children. race_fill ("candidates" ou "elites")
+    diz quem fica com as vagas dos filhos descartados (ver run_ga).
+    surrogate_pool > 1 liga a pré-triagem
+    dos filhos pelo surrogate; ver _screen_children.
+
+    early_stop=K encerra o GA após K gerações seguidas sem melhora do
+    best_of_best (state["stopped"]). 'initial_population' (matriz de genes)
+    semeia a população inicial: as linhas são corrigidas, cortadas em
+    population_size e o resto é completado com indivíduos aleatórios; um
+    hash dela fica em params, para o resume não misturar sementes.
+    """
+    if race_fill not in RACE_FILLS:
+        raise ValueError(f"race_fill desconhecido: {race_fill!r} (use {RACE_FILLS})")
+    if seed_seq is None:
+        seed_seq = np.random.SeedSequence(seed)
+
+    rngs = slot_rngs(seed_seq, (STREAM_INIT, 0), population_size)
+    if initial_population is None:
+        population = random_population(population_size, rngs)
+    else:
+        seeded = fix_population(np.array(initial_population, dtype=float)[:population_size])
+        population = np.vstack([seeded, random_population(population_size - len(seeded), rngs[len(seeded):])])
+    evals, fitness = _evaluate_population(population, market, fee, cache, executor)
 
-    # ---- GENOCÍDIO (professor) ----
-    best_of_best = None
-    best_of_best_fit = -float("inf")
+    return {
+        "params": {
+            "population_size": population_size,
+            "generations": generations,
+            "elite_frac": elite_frac,
+            "mutation_rate": mutation_rate,
+            "tournament_size": tournament_size,
+            "fee": fee,
+            "seed": seed,
+            "race_rungs": [float(f) for f in race_rungs] if race_rungs else None,
+            "race_eta": race_eta,
+            "race_audit_every": race_audit_every,
+            "race_fill": race_fill,
+            "surrogate_pool": surrogate_pool,
+            "surrogate_explore": surrogate_explore,
+            "surrogate_k": surrogate_k,
+            "early_stop": early_stop,
+            "initial_population": _population_digest(initial_population),
+        },
+        "seed_seq": seed_seq,
+        "population": population,
+        "fitness": fitness,
+        "evals": evals,
+        "generation": 0,
+        "history": [],                  # melhor fitness por geração
+        "mutation_rate": mutation_rate,
+        "count_stagnation": 0,          # controla a mutação adaptativa
+        "count_genocide": 0,            # controla o genocídio (separado)
+        "count_plateau": 0,             # gerações sem melhora do best_of_best (early stop)
+        "stopped": False,
+        "best_prev": None,
+        "best_of_best": None,           # melhor genoma global (linha da matriz)
+        "best_of_best_fit": -float("inf"),
+        "genocide_toggle": 1,           # alterna 1 e 2
+        "race_stats": new_race_stats(),
+        # arquivo (genes, fitness) de tudo que foi avaliado, para o surrogate
+        "archive_X": population.copy() if surrogate_pool > 1 else np.empty((0, population.shape[1])),
+        "archive_y": fitness.copy() if surrogate_pool > 1 else np.empty(0),
+    }
 
-    genocide_toggle = 1      # alterna 1 e 2
-    GENOCIDE_STAG = 30       # qtas gerações SEM melhorar pra ativar genocídio
 
-    for gen in range(generations):
-        # 1) Ordena e pega o melhor da geração
-        population.sort(key=lambda ind: ind["fitness"], reverse=True)
-        best = population[0]
+def step_ga(state, market, n_generations=1, cache=None, executor=None, verbose=True):
+    """
+    Avança o GA 'n_generations' gerações a partir de 'state' (in-place),
+    com o mesmo laço do run_ga; 'executor' pode ser None (serial).
+    Retorna o próprio estado.
+    """
+    params = state["params"]
+    population_size = params["population_size"]
+    fee = params["fee"]
+    seed_seq = state["seed_seq"]
+
+    population = state["population"]
+    fitness = state["fitness"]
+    evals = state["evals"]
+
+    # prefixos da corrida (views sem cópia, fingerprint calculado uma vez)
+    race_markets = [
+        market.window(0, max(2, int(frac * len(market))))
+        for frac in (params["race_rungs"] or ())
+    ]
+
+    for _ in range(n_generations):
+        if state["stopped"]:
+            break
+        gen = state["generation"]
+        state["generation"] += 1
+
+        # 1) Melhor da geração (sem ordenar a população)
+        best_idx = int(np.argmax(fitness))
+        best = evals[best_idx]
 
         # 2) Atualiza best_of_best (melhor global)
-        if best["fitness"] > best_of_best_fit:
-            best_of_best_fit = best["fitness"]
-            best_of_best = copy.deepcopy(best["genome"])
-
-        history.append(best["fitness"])
+        if best["fitness"] - state["best_of_best_fit"] > DELTA:
+            state["count_plateau"] = 0
+        else:
+            state["count_plateau"] += 1
+
+        if best["fitness"] > state["best_of_best_fit"]:
+            state["best_of_best_fit"] = best["fitness"]
+            state["best_of_best"] = population[best_idx].copy()
+
+        state["history"].append(best["fitness"])
+
+        # early stop: a população atual (já avaliada) fica como resultado
+        patience = params["early_stop"]
+        if patience and state["count_plateau"] >= patience:
+            state["stopped"] = True
+            # um genocídio tipo 2 pode ter trocado a população inteira: o
+            # melhor de todos volta no lugar do pior (para o ga_best e a
+            # elite do warm start)
+            if state["best_of_best_fit"] > fitness[best_idx]:
+                worst = int(np.argmin(fitness))
+                keep_evals, keep_fitness = _evaluate_population(
+                    state["best_of_best"][None, :], market, fee, cache, executor
+                )
+                population = population.copy()
+                fitness = fitness.copy()
+                evals = list(evals)
+                population[worst] = state["best_of_best"]
+                fitness[worst] = keep_fitness[0]
+                evals[worst] = keep_evals[0]
+            if verbose:
+                print(f"[INFO] Early stop na geração {gen+1}: {patience} gerações sem melhora.")
+            break
 
         # 3) Estagnação / mutação adaptativa
         best_now = best["fitness"]
 
-        if best_prev is None:
+        if state["best_prev"] is None:
             improv = None
-            count_stagnation = 0
-            count_genocide = 0
+            state["count_stagnation"] = 0
+            state["count_genocide"] = 0
         else:
-            improv = best_now - best_prev
+            improv = best_now - state["best_prev"]
 
             if improv <= DELTA:
-                count_stagnation += 1
-                count_genocide += 1
+                state["count_stagnation"] += 1
+                state["count_genocide"] += 1
             else:
-                count_stagnation = 0
-                count_genocide = 0
-                mutation_rate = mutation_rate_original
-
-        best_prev = best_now
+                state["count_stagnation"] = 0
+                state["count_genocide"] = 0
+                state["mutation_rate"] = params["mutation_rate"]
 
-        improv_str = "None" if improv is None else f"{improv:.6g}"
+        state["best_prev"] = best_now
 
         # aumenta mutação se estagnou 10 gerações (e zera SÓ esse contador)
-        if count_stagnation > 10:
-            mutation_rate = min(MUT_MAX, mutation_rate * 10)
-            count_stagnation = 0
+        if state["count_stagnation"] > 10:
+            state["mutation_rate"] = min(MUT_MAX, state["mutation_rate"] * 10)
+            state["count_stagnation"] = 0
+
+        mutation_rate = state["mutation_rate"]
 
         # prints
-        print(
-            f"Geração {gen+1}/{generations} | "
-            f"Fit: {best['fitness']:.2f} | "
-            f"Ret: {best['total_return_pct']:.2f}% | "
-            f"MDD: {best['mdd_pct']:.2f}% | "
-            f"Calmar: {best['calmar']:.2f} | "
-            f"Sortino: {best['sortino']:.2f} | "
-            f"Trades: {best['n_trades']}"
-        )
-        print(f"   Δfit={improv_str} | stag_mut={count_stagnation} | stag_gen={count_genocide} | mut={mutation_rate:.4f}")
+        if verbose:
+            improv_str = "None" if improv is None else f"{improv:.6g}"
+            print(
+                f"Geração {gen+1}/{params['generations']} | "
+                f"Fit: {best['fitness']:.2f} | "
+                f"Ret: {best['total_return_pct']:.2f}% | "
+                f"MDD: {best['mdd_pct']:.2f}% | "
+                f"Calmar: {best['calmar']:.2f} | "
+                f"Sortino: {best['sortino']:.2f} | "
+                f"Trades: {best['n_trades']}"
+            )
+            cache_str = ""
+            if cache is not None:
+                hits, misses = cache.take_counters()
+                cache_str = f" | cache hit/miss={hits}/{misses}"
+            print(
+                f"   Δfit={improv_str} | stag_mut={state['count_stagnation']} | "
+                f"stag_gen={state['count_genocide']} | mut={mutation_rate:.4f}{cache_str}"
+            )
 
         # 4) GENOCÍDIO (professor): alterna Tipo 1 e Tipo 2
-        if count_genocide >= GENOCIDE_STAG:
-            print(f"🔥 GENOCÍDIO ativado na geração {gen+1}! tipo={genocide_toggle}")
-
-            new_pop = []
+        if state["count_genocide"] >= GENOCIDE_STAG:
+            toggle = state["genocide_toggle"]
+            if verbose:
+                print(f"🔥 GENOCÍDIO ativado na geração {gen+1}! tipo={toggle}")
 
-            if genocide_toggle == 1:
+            rngs = slot_rngs(seed_seq, (STREAM_GENOCIDE, gen), population_size)
+            if toggle == 1:
                 # Tipo 1: mata todo mundo, mantém o melhor de todos (best_of_best)
-                keep = copy.deepcopy(best_of_best) if best_of_best is not None else copy.deepcopy(best["genome"])
-                eval_res = evaluate_genome(keep, Px, Py, fee)
-                new_pop.append({"genome": keep, **eval_res})
-
-            # Tipo 2: mata todo mundo (new_pop começa vazio mesmo)
-
-            # repopula com random
-            while len(new_pop) < population_size:
-                g = random_genome()
-                eval_res = evaluate_genome(g, Px, Py, fee)
-                new_pop.append({"genome": g, **eval_res})
+                keep = state["best_of_best"] if state["best_of_best"] is not None else population[best_idx]
+                population = np.vstack([keep, random_population(population_size - 1, rngs[1:])])
+            else:
+                # Tipo 2: mata todo mundo
+                population = random_population(population_size, rngs)
 
-            population = new_pop
+            evals, fitness = _evaluate_population(population, market, fee, cache, executor)
+            _archive(state, population, fitness)
 
             # alterna 1 <-> 2
-            genocide_toggle = 2 if genocide_toggle == 1 else 1
+            state["genocide_toggle"] = 2 if toggle == 1 else 1
 
             # reseta controles
-            count_stagnation = 0
-            count_genocide = 0
-            mutation_rate = mutation_rate_original
+            state["count_stagnation"] = 0
+            state["count_genocide"] = 0
+            state["mutation_rate"] = params["mutation_rate"]
 
             # pula a reprodução nessa geração (já recriou população inteira)
             continue
 
         # 5) Elitismo + reprodução normal (se NÃO teve genocídio)
-        elite_count = max(1, int(elite_frac * population_size))
-        new_population = population[:elite_count]
+        elite_count = max(1, int(params["elite_frac"] * population_size))
+        n_children = population_size - elite_count
+        elites = select_elites(fitness, elite_count)
+
+        # todo o sorteio fica aqui; os filhos são avaliados em lote.
+        # cada filho (slot) tem o seu stream: os 2 torneios, o crossover e
+        # a mutação dele saem só dali
+        # "candidates": filhos extras para a corrida devolver n_children
+        # sobreviventes (cada etapa fica com ceil(vivos / race_eta))
+        n_race = n_children
+        if params["race_rungs"] and params["race_fill"] == "candidates":
+            n_race = n_children * params["race_eta"] ** len(params["race_rungs"])
+        pool = params["surrogate_pool"]
+        n_candidates = n_race * pool if pool > 1 else n_race
+        rngs = slot_rngs(seed_seq, (STREAM_CHILD, gen), n_candidates)
+        parents = tournament_selection(
+            fitness, params["tournament_size"], 2 * n_candidates, [g for g in rngs for _ in range(2)]
+        ).reshape(n_candidates, 2)
+        children = crossover_population(population[parents[:, 0]], population[parents[:, 1]], rngs)
+        children = mutate_population(children, mutation_rate, rngs)
+        predicted = None
+        if pool > 1:
+            rng_screen = slot_rngs(seed_seq, (STREAM_SCREEN, gen), 1)[0]
+            children, predicted = _screen_children(children, n_race, state, rng_screen)
+
+        if params["race_rungs"]:
+            # só os sobreviventes da corrida entram; com race_fill="elites"
+            # as vagas dos descartados ficam com os próximos melhores da
+            # população atual
+            keep, child_evals, child_fitness = _race_children(
+                children, n_children, state, market, race_markets, cache, executor, verbose
+            )
+            children = children[keep]
+            if predicted is not None:
+                predicted = predicted[keep]
+            elites = select_elites(fitness, population_size - len(children))
+        else:
+            child_evals, child_fitness = _evaluate_population(children, market, fee, cache, executor)
+
+        if pool > 1:
+            _archive(state, children, child_fitness)
+            if verbose:
+                rho = _spearman(predicted, child_fitness) if len(children) >= 3 else None
+                print(f"   surrogate: Spearman previsto x real {'n/a' if rho is None else f'{rho:.2f}'}")
+
+        population = np.vstack([population[elites], children])
+        fitness = np.concatenate([fitness[elites], child_fitness])
+        evals = [evals[i] for i in elites] + child_evals
 
-        while len(new_population) < population_size:
-            parent1 = tournament_selection(population, k=tournament_size)
-            parent2 = tournament_selection(population, k=tournament_size)
+    state["population"] = population
+    state["fitness"] = fitness
+    state["evals"] = evals
+    return state
 
-            child_genome = crossover(parent1["genome"], parent2["genome"])
-            child_genome = mutate(child_genome, mutation_rate=mutation_rate)  # sua mutação fica igual
 
-            eval_res = evaluate_genome(child_genome, Px, Py, fee)
-            new_population.append({"genome": child_genome, **eval_res})
+# tamanho máximo do arquivo do surrogate (os mais antigos saem primeiro)
+ARCHIVE_MAX = 20000
+
+
+def _archive(state, pop, fitness):
+    """Acrescenta avaliações completas ao arquivo do surrogate (se ligado)."""
+    if state["params"]["surrogate_pool"] <= 1:
+        return
+    state["archive_X"] = np.vstack([state["archive_X"], pop])[-ARCHIVE_MAX:]
+    state["archive_y"] = np.concatenate([state["archive_y"], fitness])[-ARCHIVE_MAX:]
+
+
+# tamanho (em floats) de cada bloco da matriz de distâncias do knn_predict:
+# ~8 MB por bloco, qualquer que seja o tamanho do arquivo ou da pré-triagem
+KNN_BLOCK = 1 << 20
+
+
+def knn_predict(X, y, queries, k=7):
+    """
+    Regressão k-NN: fitness previsto de cada linha de 'queries' como média
+    dos k vizinhos mais próximos em X (genes normalizados pela faixa de
+    GENOME_BOUNDS), ponderada pelo inverso da distância.
+
+    As distâncias são calculadas em blocos de queries (KNN_BLOCK floats
+    por bloco), sem montar a matriz queries x arquivo inteira.
+    """
+    ok = np.isfinite(y)
+    X, y = X[ok], y[ok]
+    if len(y) == 0:
+        return np.zeros(len(queries))
+
+    scale = UPPER - LOWER
+    Xn = X / scale
+    x2 = (Xn ** 2).sum(axis=1)
+    k = min(k, len(y))
+    block = max(1, KNN_BLOCK // len(y))
+
+    pred = np.empty(len(queries))
+    for start in range(0, len(queries), block):
+        Qn = queries[start:start + block] / scale
+        # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2
+        d2 = (Qn ** 2).sum(axis=1)[:, None] - 2.0 * Qn @ Xn.T + x2[None, :]
+        np.maximum(d2, 0.0, out=d2)
+
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        d = np.sqrt(np.take_along_axis(d2, nearest, axis=1))
+        w = 1.0 / (d + 1e-9)
+        pred[start:start + block] = (w * y[nearest]).sum(axis=1) / w.sum(axis=1)
+    return pred
+
+
+def _screen_children(candidates, n_children, state, rng):
+    """
+    Pré-triagem pelo surrogate: dos candidatos, (1 - surrogate_explore) das
+    vagas vão para os de maior fitness previsto e o resto é sorteado entre
+    os que sobraram (exploração). Retorna (filhos escolhidos, previsões).
+    """
+    params = state["params"]
+    predicted = knn_predict(state["archive_X"], state["archive_y"], candidates, params["surrogate_k"])
+
+    n_explore = int(round(params["surrogate_explore"] * n_children))
+    n_best = n_children - n_explore
+    order = np.argsort(-predicted, kind="stable")
+    chosen = order[:n_best]
+    if n_explore:
+        chosen = np.concatenate([chosen, rng.choice(order[n_best:], size=n_explore, replace=False)])
+
+    return candidates[chosen], predicted[chosen]
+
+
+def _cache_misses(pop, market, fee, cache):
+    """
+    Máscara dos genomas de 'pop' que o _evaluate_batch vai de fato
+    avaliar: fora do cache e primeira ocorrência no lote.
+    """
+    if cache is None:
+        return np.ones(len(pop), dtype=bool)
+    miss = np.zeros(len(pop), dtype=bool)
+    seen = set()
+    for i, g in enumerate(array_to_genomes(pop)):
+        key = cache.key(g, market.fingerprint, fee)
+        miss[i] = key not in cache and key not in seen
+        seen.add(key)
+    return miss
+
+
+def new_race_stats():
+    return {
+        "generations": 0,
+        "candidates": 0,        # filhos que entraram na corrida
+        "budget": 0,            # custo sem corrida: uma avaliação completa por vaga de filho
+        "survivors": 0,         # filhos que chegaram à avaliação completa
+        "cost": 0.0,            # custo em avaliações completas equivalentes (só fora do cache)
+        "reused": 0.0,          # ... desse custo que veio do snapshot do prefixo anterior
+        "rank_corr_sum": 0.0,   # soma das correlações (Spearman) prefixo x completo
+        "rank_corr_n": 0,
+        "audited": 0,           # descartados reavaliados por completo (auditoria)
+        "false_discards": 0,    # ... que teriam batido o pior sobrevivente
+    }
+
+
+def _spearman(a, b):
+    ra = np.argsort(np.argsort(a)).astype(float)
+    rb = np.argsort(np.argsort(b)).astype(float)
+    if ra.std() == 0 or rb.std() == 0:
+        return None
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _race_children(children, n_slots, state, market, race_markets, cache, executor, verbose):
+    """
+    Successive halving dos filhos: em cada prefixo de race_markets (dados
+    [0, fração * T)) os vivos são avaliados e só o 1/race_eta melhor segue;
+    só quem passa por todos os prefixos recebe o evaluate_genome completo.
+
+    O custo é contado em avaliações completas equivalentes (fração dos dados
+    usada), só para os backtests que rodam de fato (hits do cache não
+    custam); a parte dele que vem pronta do snapshot do prefixo anterior
+    (backtest retomado, não refeito) vai em "reused". A concordância de
+    ranking é a correlação de Spearman entre a
+    nota no último prefixo e o fitness completo dos sobreviventes. A cada
+    race_audit_every gerações (0 = nunca) os descartados também são
+    avaliados por completo para contar descartes indevidos.
+
+    Retorna (índices dos sobreviventes, avaliações, fitness).
+    """
+    params = state["params"]
+    fee = params["fee"]
+    stats = state["race_stats"]
+    T = len(market)
+
+    alive = np.arange(len(children))
+    cost = reused = 0.0
+    discarded = []
+    scores = None
+    # backtest de cada filho no fim do prefixo anterior: o próximo prefixo
+    # (e a avaliação completa) continua dali em vez de refazer o começo
+    snapshots = [None] * len(children)
+    for prefix in race_markets:
+        resumes = [snapshots[i] for i in alive]
+        miss = _cache_misses(children[alive], prefix, fee, cache)
+        evals_prefix, scores, snaps = _evaluate_population(children[alive], prefix, fee, cache, executor, resumes)
+        cost += miss.sum() * len(prefix) / T
+        reused += sum(r["t"] for r, m in zip(resumes, miss) if m and r is not None) / T
+        for i, snap in zip(alive.tolist(), snaps):
+            snapshots[i] = snap
+        n_next = max(1, -(-len(alive) // params["race_eta"]))
+        order = np.argsort(-scores, kind="stable")
+        discarded.extend(alive[order[n_next:]].tolist())
+        alive, scores = alive[order[:n_next]], scores[order[:n_next]]
+
+    resumes = [snapshots[i] for i in alive]
+    miss = _cache_misses(children[alive], market, fee, cache)
+    evals, fitness, _ = _evaluate_population(children[alive], market, fee, cache, executor, resumes)
+    cost += miss.sum()
+    reused += sum(r["t"] for r, m in zip(resumes, miss) if m and r is not None) / T
+
+    stats["generations"] += 1
+    stats["candidates"] += len(children)
+    stats["budget"] += n_slots
+    stats["survivors"] += len(alive)
+    stats["cost"] += cost
+    stats["reused"] += reused
+    rho = _spearman(scores, fitness) if len(alive) >= 3 else None
+    if rho is not None:
+        stats["rank_corr_sum"] += rho
+        stats["rank_corr_n"] += 1
+
+    audit = params["race_audit_every"]
+    if audit and discarded and stats["generations"] % audit == 0:
+        _, full_discarded = _evaluate_population(children[discarded], market, fee, cache, executor)
+        stats["audited"] += len(discarded)
+        stats["false_discards"] += int((full_discarded > fitness.min()).sum())
+
+    if verbose:
+        rho_str = "n/a" if rho is None else f"{rho:.2f}"
+        print(
+            f"   corrida: {len(alive)}/{len(children)} filhos na avaliação completa | "
+            f"custo {cost:.1f} aval. (sem corrida: {n_slots}; {reused:.1f} reaproveitado) | Spearman {rho_str}"
+        )
+
+    return alive, evals, fitness
+
+
+def race_report(stats):
+    """
+    Resumo da corrida: orçamento economizado e discordância de ranking.
+    A economia é contra o custo sem corrida ("budget"); negativa = a
+    corrida custou mais (ex.: race_fill="candidates").
+    """
+    if not stats["candidates"]:
+        return "corrida: nenhuma geração com filhos"
+    saved = 1.0 - stats["cost"] / stats["budget"]
+    parts = [
+        f"corrida: {stats['survivors']}/{stats['candidates']} filhos avaliados por completo",
+        f"orçamento usado {stats['cost']:.1f} aval., sem corrida {stats['budget']} ({saved:.0%} economizado)",
+    ]
+    if stats["reused"]:
+        parts.append(f"backtest reaproveitado dos prefixos {stats['reused']:.1f} aval.")
+    if stats["rank_corr_n"]:
+        parts.append(f"Spearman médio prefixo x completo {stats['rank_corr_sum'] / stats['rank_corr_n']:.2f}")
+    if stats["audited"]:
+        parts.append(f"descartes indevidos {stats['false_discards']}/{stats['audited']} auditados")
+    return " | ".join(parts)
+
+
+def ga_best(state, market):
+    """
+    Melhor indivíduo da população atual, no formato do run_ga:
+    {"genome": ..., **avaliação completa (com "result")}.
+    """
+    best_idx = int(np.argmax(state["fitness"]))
+    best = {"genome": row_to_genome(state["population"][best_idx]), **state["evals"][best_idx]}
 
-        population = new_population
+    # avaliações do GA não trazem "result" (curva + trades): refaz só a do melhor
+    if "result" not in best:
+        fee = state["params"]["fee"]
+        best = {"genome": best["genome"], **evaluate_genome(best["genome"], None, None, fee, market=market)}
 
-    population.sort(key=lambda ind: ind["fitness"], reverse=True)
-    best = population[0]
-    
-    return best, history
+    return best
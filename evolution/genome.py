@@ -1,7 +1,6 @@
 # evolution/genome.py
 
-import random
-import copy
+import numpy as np
 
 # Faixas "realistas" para swing trade diário em ações brasileiras
 GENOME_BOUNDS = {
@@ -22,8 +21,64 @@ GENOME_BOUNDS = {
 }
 
 
-def _clamp(value, low, high):
-    return max(low, min(high, value))
+# Esquema dos genes: coluna de cada gene na matriz da população (N x 5)
+GENE_NAMES = tuple(GENOME_BOUNDS)
+GENE_INDEX = {name: i for i, name in enumerate(GENE_NAMES)}
+LOWER = np.array([GENOME_BOUNDS[k][0] for k in GENE_NAMES], dtype=float)
+UPPER = np.array([GENOME_BOUNDS[k][1] for k in GENE_NAMES], dtype=float)
+
+# genes inteiros e o passo máximo (+-) da mutação de cada um
+INTEGER_STEPS = {"lag": 1, "max_hold": 2}
+IS_INTEGER = np.array([k in INTEGER_STEPS for k in GENE_NAMES])
+
+# mutação gaussiana: desvio = 15% da faixa do gene
+MUTATION_SIGMA = 0.15 * (UPPER - LOWER)
+
+_TP = GENE_INDEX["tp"]
+_SL = GENE_INDEX["sl"]
+
+
+def genome_to_row(g):
+    return np.array([g[k] for k in GENE_NAMES], dtype=float)
+
+
+def row_to_genome(row):
+    return {
+        k: int(v) if k in INTEGER_STEPS else v
+        for k, v in zip(GENE_NAMES, row.tolist())
+    }
+
+
+def genomes_to_array(genomes):
+    """Lista de genomas (dicts) -> matriz (N x 5)."""
+    pop = np.empty((len(genomes), len(GENE_NAMES)))
+    for i, g in enumerate(genomes):
+        pop[i] = [g[k] for k in GENE_NAMES]
+    return pop
+
+
+def array_to_genomes(pop):
+    """Matriz (N x 5) -> lista de genomas (dicts)."""
+    return [row_to_genome(row) for row in pop]
+
+
+def fix_population(pop):
+    """
+    _fix_constraints para a população inteira (in-place, devolve 'pop'):
+    limites de GENOME_BOUNDS, |sl| >= tp e lag/max_hold inteiros.
+    """
+    np.clip(pop, LOWER, UPPER, out=pop)
+
+    # força |sl| >= tp (mantém sinal negativo)
+    bad = np.abs(pop[:, _SL]) < pop[:, _TP]
+    pop[bad, _SL] = np.clip(-pop[bad, _TP], LOWER[_SL], UPPER[_SL])
+
+    # lag e max_hold inteiros (arredondamento igual ao round do Python)
+    pop[:, IS_INTEGER] = np.round(pop[:, IS_INTEGER])
+
+    # garante de novo dentro da faixa
+    np.clip(pop, LOWER, UPPER, out=pop)
+    return pop
 
 
 def _fix_constraints(g):
@@ -33,99 +88,120 @@ def _fix_constraints(g):
     - |sl| >= tp  (stop nunca mais apertado que o alvo)
     - lag, max_hold inteiros
     """
-    # clamp básicos
-    for key, (lo, hi) in GENOME_BOUNDS.items():
-        g[key] = _clamp(g[key], lo, hi)
+    g.update(row_to_genome(fix_population(genome_to_row(g)[None, :])[0]))
+    return g
 
-    # força |sl| >= tp
-    if abs(g["sl"]) < g["tp"]:
-        g["sl"] = -g["tp"]  # mantém sinal negativo
-        lo, hi = GENOME_BOUNDS["sl"]
-        g["sl"] = _clamp(g["sl"], lo, hi)
 
-    # lag e max_hold inteiros
-    g["lag"] = int(round(g["lag"]))
-    g["max_hold"] = int(round(g["max_hold"]))
+def slot_rngs(seed_seq, key, n):
+    """
+    n geradores independentes, um por slot: o do slot i sai de
+    SeedSequence(entropia, spawn_key = seed_seq.spawn_key + key + (i,)).
 
-    # garante de novo dentro da faixa
-    for key, (lo, hi) in GENOME_BOUNDS.items():
-        g[key] = _clamp(g[key], lo, hi)
+    Cada stream depende só da seed e do seu endereço (ex.: geração e slot),
+    não de quantos números os outros slots consumiram nem de onde/quando
+    cada avaliação roda.
+    """
+    prefix = tuple(seed_seq.spawn_key) + tuple(key)
+    return [
+        np.random.default_rng(np.random.SeedSequence(seed_seq.entropy, spawn_key=prefix + (i,)))
+        for i in range(n)
+    ]
 
-    return g
+
+def draw_rows(rng, n, method, *args, size=(), **kwargs):
+    """
+    n linhas de rng.<method>(*args, size=(n, *size), **kwargs), ex.:
+    draw_rows(rng, n, "normal", 0.0, 1.0, size=(5,)). 'rng' é um
+    np.random.Generator (um sorteio só para as n linhas) ou uma lista de n
+    geradores (linha i sorteada pelo gerador i, ver slot_rngs).
+    """
+    if isinstance(rng, np.random.Generator):
+        return getattr(rng, method)(*args, size=(n, *size), **kwargs)
+    if len(rng) != n:
+        raise ValueError(f"{len(rng)} geradores para {n} linhas")
+    if n == 0:
+        dtype = kwargs.get("dtype", np.int64) if method == "integers" else float
+        return np.empty((0, *size), dtype=dtype)
+    return np.concatenate([getattr(g, method)(*args, size=(1, *size), **kwargs) for g in rng])
+
+
+def random_population(n, rng):
+    """
+    n genomas aleatórios (matriz n x 5) dentro dos limites, com as
+    constraints aplicadas. 'rng' é um np.random.Generator ou uma lista
+    de n geradores, um por linha (ver slot_rngs).
+    """
+    pop = draw_rows(rng, n, "uniform", LOWER, UPPER, size=(len(GENE_NAMES),))
+    pop[:, IS_INTEGER] = draw_rows(
+        rng, n, "integers",
+        LOWER[IS_INTEGER].astype(int), UPPER[IS_INTEGER].astype(int) + 1,
+        size=(int(IS_INTEGER.sum()),),
+    )
+    return fix_population(pop)
+
+
+def crossover_population(parents1, parents2, rng):
+    """
+    crossover linha a linha: média nos contínuos, um dos pais nos inteiros.
+    'rng': Generator ou um gerador por linha.
+    """
+    children = 0.5 * (parents1 + parents2)
+    pick_first = draw_rows(rng, len(children), "random", size=(int(IS_INTEGER.sum()),)) < 0.5
+    children[:, IS_INTEGER] = np.where(pick_first, parents1[:, IS_INTEGER], parents2[:, IS_INTEGER])
+    return fix_population(children)
 
 
-def random_genome():
+def mutate_population(pop, mutation_rate, rng):
+    """
+    mutate para a população inteira (devolve uma matriz nova).
+
+    Cada linha muta com probabilidade 'mutation_rate'; se mutar, k genes
+    distintos (k = 1, 2, 3 com prob. 0.6 / 0.3 / 0.1) recebem ruído
+    gaussiano (contínuos, escalado por mutation_rate) ou um passo inteiro
+    (lag +-1, max_hold +-2). 'rng': Generator ou um gerador por linha.
+    """
+    n, n_genes = pop.shape
+    mutates = draw_rows(rng, n, "random") < mutation_rate
+
+    r = draw_rows(rng, n, "random")
+    k = 1 + (r > 0.6) + (r > 0.9)
+    # k genes sem repetição: os k menores de uma permutação aleatória por linha
+    ranks = draw_rows(rng, n, "random", size=(n_genes,)).argsort(axis=1).argsort(axis=1)
+    chosen = (ranks < k[:, None]) & mutates[:, None]
+
+    delta = draw_rows(rng, n, "normal", 0.0, 1.0, size=(n_genes,)) * MUTATION_SIGMA * mutation_rate
+    for name, step in INTEGER_STEPS.items():
+        delta[:, GENE_INDEX[name]] = draw_rows(rng, n, "integers", -step, step + 1)
+
+    out = pop + np.where(chosen, delta, 0.0)
+    out[mutates] = fix_population(out[mutates])
+    return out
+
+
+def random_genome(rng=None):
     """
     Cria um genoma aleatório dentro dos limites e respeitando as constraints.
+    'rng': np.random.Generator (None = gerador novo, sem seed).
     """
-    g = {
-        "threshold": random.uniform(*GENOME_BOUNDS["threshold"]),
-        "tp":        random.uniform(*GENOME_BOUNDS["tp"]),
-        "sl":        random.uniform(*GENOME_BOUNDS["sl"]),
-        "lag":       random.randint(*GENOME_BOUNDS["lag"]),
-        "max_hold":  random.randint(*GENOME_BOUNDS["max_hold"]),
-    }
-    return _fix_constraints(g)
+    if rng is None:
+        rng = np.random.default_rng()
+    return row_to_genome(random_population(1, rng)[0])
 
 
-def crossover(g1, g2):
+def crossover(g1, g2, rng=None):
     """
     Crossover simples:
     - média para parâmetros contínuos
     - escolha aleatória para inteiros
     """
-    child = {}
-
-    # contínuos
-    child["threshold"] = 0.5 * (g1["threshold"] + g2["threshold"])
-    child["tp"]        = 0.5 * (g1["tp"]        + g2["tp"])
-    child["sl"]        = 0.5 * (g1["sl"]        + g2["sl"])
-
-    # inteiros
-    child["lag"]       = random.choice([g1["lag"], g2["lag"]])
-    child["max_hold"]  = random.choice([g1["max_hold"], g2["max_hold"]])
-
-    return _fix_constraints(child)
-
-
-def mutate(genome, mutation_rate):
-    
-    if random.random()>=mutation_rate:
-        return genome
-    else:
-
-        r=random.random()
-        if r<=0.6:
-            k=1
-        elif r<=0.9:
-            k=2
-        else:
-            k=3
-
-        g = copy.deepcopy(genome)
-
-        thr_lo, thr_hi = GENOME_BOUNDS["threshold"]
-        tp_lo, tp_hi   = GENOME_BOUNDS["tp"]
-        sl_lo, sl_hi   = GENOME_BOUNDS["sl"]
-
-        thr_range = thr_hi - thr_lo
-        tp_range  = tp_hi  - tp_lo
-        sl_range  = sl_hi  - sl_lo
-
-        genes=["threshold","tp","sl","lag","max_hold"]
-        
-        genes_to_mutate=random.sample(genes,k)
-
-        for gene in genes_to_mutate:
-            if gene=="threshold":
-                g["threshold"] += random.gauss(0.0, 0.15 * thr_range) * mutation_rate
-            elif gene=="tp":
-                g["tp"] += random.gauss(0.0, 0.15 * tp_range) * mutation_rate
-            elif gene=="sl":
-                g["sl"] += random.gauss(0.0, 0.15 * sl_range) * mutation_rate
-            elif gene=="lag":
-                g["lag"] += random.choice([-1, 0, 1])
-            elif gene=="max_hold":
-                g["max_hold"] += random.choice([-2, -1, 0, 1, 2])
-
-        return _fix_constraints(g)
+    if rng is None:
+        rng = np.random.default_rng()
+    child = crossover_population(genome_to_row(g1)[None, :], genome_to_row(g2)[None, :], rng)
+    return row_to_genome(child[0])
+
+
+def mutate(genome, mutation_rate, rng=None):
+    """mutate_population para um genoma só (dict)."""
+    if rng is None:
+        rng = np.random.default_rng()
+    return row_to_genome(mutate_population(genome_to_row(genome)[None, :], mutation_rate, rng)[0])
@@ -0,0 +1,173 @@
+# evolution/islands.py
+
+import numpy as np
+
+from core.market import PreparedMarketData
+from evolution.cache import FitnessCache
+from evolution.ga import ga_best, new_ga_state, select_elites, step_ga
+from evolution.parallel import check_evaluation_pool, make_evaluation_pool, worker_market
+
+TOPOLOGIES = ("ring", "full")
+
+# cache de avaliações de cada worker (a chave inclui o fingerprint dos dados)
+_WORKER_CACHE = None
+
+
+def _worker_cache(cache_size):
+    global _WORKER_CACHE
+    if _WORKER_CACHE is None and cache_size > 0:
+        _WORKER_CACHE = FitnessCache(maxsize=cache_size)
+    return _WORKER_CACHE
+
+
+def _init_island_task(task):
+    ga_kwargs, seed_seq, start, stop, cache_size = task
+    market = worker_market().window(start, stop)
+    return new_ga_state(market, cache=_worker_cache(cache_size), seed_seq=seed_seq, **ga_kwargs)
+
+
+def _step_island_task(task):
+    state, n_generations, start, stop, cache_size = task
+    market = worker_market().window(start, stop)
+    return step_ga(state, market, n_generations, cache=_worker_cache(cache_size), verbose=False)
+
+
+def migration_sources(n_islands, topology="ring"):
+    """
+    De quais ilhas cada ilha recebe migrantes:
+    - "ring": a ilha i recebe da i-1 (anel)
+    - "full": recebe de todas as outras
+    """
+    if topology == "ring":
+        return [[(i - 1) % n_islands] for i in range(n_islands)] if n_islands > 1 else [[]]
+    if topology == "full":
+        return [[j for j in range(n_islands) if j != i] for i in range(n_islands)]
+    raise ValueError(f"topologia desconhecida: {topology!r} (use {TOPOLOGIES})")
+
+
+def migrate(states, n_migrants=2, topology="ring"):
+    """
+    Troca de indivíduos entre ilhas (in-place): os 'n_migrants' melhores de
+    cada ilha de origem substituem os piores da ilha de destino. Os
+    migrantes levam a avaliação junto (mesmo dataset), sem reavaliar.
+    """
+    if n_migrants <= 0:
+        return states
+
+    # migrantes saem do estado anterior à troca
+    outgoing = []
+    for st in states:
+        idx = select_elites(st["fitness"], min(n_migrants, len(st["fitness"])))
+        outgoing.append((st["population"][idx].copy(), st["fitness"][idx].copy(), [st["evals"][i] for i in idx]))
+
+    for st, sources in zip(states, migration_sources(len(states), topology)):
+        if not sources:
+            continue
+        pop = np.vstack([outgoing[j][0] for j in sources])
+        fit = np.concatenate([outgoing[j][1] for j in sources])
+        evs = [e for j in sources for e in outgoing[j][2]]
+
+        # nunca substitui a ilha inteira: o melhor local fica
+        m = min(len(fit), len(st["fitness"]) - 1)
+        if m <= 0:
+            continue
+        worst = np.argpartition(st["fitness"], m - 1)[:m]
+        st["population"][worst] = pop[:m]
+        st["fitness"][worst] = fit[:m]
+        for w, e in zip(worst.tolist(), evs[:m]):
+            st["evals"][w] = e
+
+    return states
+
+
+def run_island_ga(
+    Px, Py,
+    n_islands=4,
+    population_size=50,
+    generations=60,
+    migration_interval=5,
+    n_migrants=2,
+    topology="ring",
+    elite_frac=0.2,
+    mutation_rate=1,
+    tournament_size=3,
+    fee=0.0005,
+    seed=42,
+    market=None,
+    cache_size=4096,
+    n_workers=None,
+    executor=None,
+):
+    """
+    GA em ilhas: 'n_islands' populações de 'population_size' evoluem
+    separadas (cada uma com o laço do run_ga: estagnação, mutação
+    adaptativa, genocídio) e, a cada 'migration_interval' gerações, trocam
+    os 'n_migrants' melhores pela topologia "ring" ou "full" (ver migrate).
+
+    Com n_workers > 1 (ou um 'executor' de make_evaluation_pool) cada ilha
+    roda suas gerações num processo do pool; a troca acontece no processo
+    principal. Cada ilha tem sua própria raiz de streams
+    (SeedSequence(seed).spawn), então o resultado não depende do nº de
+    workers.
+
+    Retorna (best, history) como o run_ga: o melhor indivíduo entre todas
+    as ilhas e o melhor fitness global por geração.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"topologia desconhecida: {topology!r} (use {TOPOLOGIES})")
+
+    if market is None:
+        market = PreparedMarketData(Px, Py)
+
+    ga_kwargs = {
+        "population_size": population_size,
+        "generations": generations,
+        "elite_frac": elite_frac,
+        "mutation_rate": mutation_rate,
+        "tournament_size": tournament_size,
+        "fee": fee,
+    }
+    seed_seqs = np.random.SeedSequence(seed).spawn(n_islands)
+
+    own_executor = executor is None and n_workers is not None and n_workers > 1
+    if own_executor:
+        executor = make_evaluation_pool(market, n_workers)
+    elif executor is not None:
+        check_evaluation_pool(executor, market)
+
+    try:
+        if executor is None:
+            cache = FitnessCache(maxsize=cache_size) if cache_size > 0 else None
+            states = [new_ga_state(market, cache=cache, seed_seq=ss, **ga_kwargs) for ss in seed_seqs]
+
+            def advance(states, n):
+                return [step_ga(st, market, n, cache=cache, verbose=False) for st in states]
+        else:
+            window = (market.start, market.stop, cache_size)
+            states = list(executor.map(_init_island_task, [(ga_kwargs, ss, *window) for ss in seed_seqs]))
+
+            def advance(states, n):
+                return list(executor.map(_step_island_task, [(st, n, *window) for st in states]))
+
+        done = 0
+        while done < generations:
+            n = min(migration_interval, generations - done)
+            states = advance(states, n)
+            done += n
+
+            bests = [float(st["fitness"].max()) for st in states]
+            print(
+                f"Gerações {done}/{generations} | "
+                f"melhor por ilha: {' '.join(f'{b:.2f}' for b in bests)} | "
+                f"global: {max(bests):.2f}"
+            )
+
+            if done < generations:
+                migrate(states, n_migrants, topology)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    history = np.max([st["history"] for st in states], axis=0).tolist()
+    best_island = int(np.argmax([st["fitness"].max() for st in states]))
+    return ga_best(states[best_island], market), history
@@ -0,0 +1,200 @@
+# evolution/nsga2.py
+
+import numpy as np
+
+from core.market import PreparedMarketData
+from evolution.cache import FitnessCache
+from evolution.ga import STREAM_CHILD, STREAM_INIT, _evaluate_batch
+from evolution.genome import (
+    array_to_genomes,
+    crossover_population,
+    draw_rows,
+    mutate_population,
+    random_population,
+    row_to_genome,
+    slot_rngs,
+)
+from evolution.parallel import check_evaluation_pool, make_evaluation_pool
+
+# objetivos: (chave da avaliação, +1 maximizar / -1 minimizar)
+# mdd_pct é <= 0, então maximizar = drawdown menor; trade_penalty é a
+# distância do nº de trades à faixa aceita pelo fitness do run_ga (0 dentro
+# dela), então minimizar não empurra a frente para o overtrading
+OBJECTIVES = (
+    ("total_return_pct", +1),
+    ("mdd_pct", +1),
+    ("trade_penalty", -1),
+)
+
+
+def objective_matrix(evals, objectives=OBJECTIVES):
+    """Avaliações -> matriz (N x M) a MINIMIZAR (objetivos de máximo trocam de sinal)."""
+    F = np.array([[e[key] for key, _ in objectives] for e in evals], dtype=float)
+    F *= -np.array([sense for _, sense in objectives], dtype=float)
+    F[~np.isfinite(F)] = np.inf  # avaliação inválida fica dominada
+    return F
+
+
+def non_dominated_sort(F):
+    """
+    Fast non-dominated sort (NSGA-II), vetorizado: a matriz de dominância
+    (N x N) sai de uma comparação por broadcast e cada frente é descascada
+    com operações de array.
+
+    Retorna o rank de cada linha (0 = frente de Pareto).
+    """
+    n = len(F)
+    le = (F[:, None, :] <= F[None, :, :]).all(axis=2)
+    lt = (F[:, None, :] < F[None, :, :]).any(axis=2)
+    dominates = le & lt                       # dominates[i, j]: i domina j
+    dominated_by = dominates.sum(axis=0)      # quantos dominam j
+
+    rank = np.full(n, -1)
+    current = np.flatnonzero(dominated_by == 0)
+    r = 0
+    while len(current):
+        rank[current] = r
+        dominated_by[current] = -1            # já ranqueados
+        dominated_by -= dominates[current].sum(axis=0)
+        current = np.flatnonzero(dominated_by == 0)
+        r += 1
+    return rank
+
+
+def crowding_distance(F, rank):
+    """
+    Distância de aglomeração de cada linha dentro da sua frente (extremos
+    de cada objetivo = inf), vetorizada por objetivo.
+    """
+    n, m = F.shape
+    dist = np.zeros(n)
+    for r in np.unique(rank):
+        idx = np.flatnonzero(rank == r)
+        if len(idx) <= 2:
+            dist[idx] = np.inf
+            continue
+        f = F[idx]
+        order = np.argsort(f, axis=0, kind="stable")
+        f_sorted = np.take_along_axis(f, order, axis=0)
+        span = f_sorted[-1] - f_sorted[0]
+        span[~np.isfinite(span) | (span == 0)] = np.inf
+
+        gaps = np.zeros_like(f_sorted)
+        gaps[1:-1] = (f_sorted[2:] - f_sorted[:-2]) / span
+        gaps[0] = gaps[-1] = np.inf
+        gaps[np.isnan(gaps)] = 0.0
+
+        d = np.zeros_like(f_sorted)
+        np.put_along_axis(d, order, gaps, axis=0)
+        dist[idx] = d.sum(axis=1)
+    return dist
+
+
+def _crowded_tournament(rank, crowd, n, rng):
+    """
+    n torneios binários: menor rank vence; empate -> maior crowding.
+    'rng': Generator ou um gerador por torneio.
+    """
+    a, b = draw_rows(rng, n, "integers", 0, len(rank), size=(2,)).T
+    a_wins = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (crowd[a] >= crowd[b]))
+    return np.where(a_wins, a, b)
+
+
+def _select_survivors(F, n):
+    """Os n melhores de F por (rank, -crowding), como no NSGA-II."""
+    rank = non_dominated_sort(F)
+    crowd = crowding_distance(F, rank)
+    keep = np.lexsort((-crowd, rank))[:n]
+    return keep, rank[keep], crowd[keep]
+
+
+def run_nsga2(
+    Px, Py,
+    population_size=100,
+    generations=60,
+    mutation_rate=1,
+    fee=0.0005,
+    seed=42,
+    objectives=OBJECTIVES,
+    market=None,
+    cache_size=4096,
+    n_workers=None,
+    executor=None,
+):
+    """
+    NSGA-II sobre os mesmos genomas/operadores do run_ga, mas sem fitness
+    ponderado: otimiza ao mesmo tempo os 'objectives' (padrão: retorno,
+    drawdown e penalidade de nº de trades) e devolve a frente de Pareto
+    inteira -- uma execução no lugar de várias execuções com pesos
+    diferentes.
+
+    Cada geração: filhos por torneio binário (rank, crowding) + crossover +
+    mutação, e a próxima população sai de pais + filhos por non-dominated
+    sort e crowding distance. Cada filho tem seu stream de sorteio
+    (seed, geração, slot), como no run_ga.
+
+    Retorna:
+      - front: lista de {"genome": ..., **avaliação} da frente de Pareto
+        final (sem genomas repetidos), ordenada pelo primeiro objetivo
+      - history: por geração, {"front_size", "best": melhor valor de cada
+        objetivo na frente}
+    """
+    if market is None:
+        market = PreparedMarketData(Px, Py)
+
+    cache = FitnessCache(maxsize=cache_size) if cache_size > 0 else None
+    seed_seq = np.random.SeedSequence(seed)
+
+    own_executor = executor is None and n_workers is not None and n_workers > 1
+    if own_executor:
+        executor = make_evaluation_pool(market, n_workers)
+    elif executor is not None:
+        check_evaluation_pool(executor, market)
+
+    def evaluate(pop):
+        return _evaluate_batch(array_to_genomes(pop), market, fee, cache, executor)
+
+    try:
+        population = random_population(population_size, slot_rngs(seed_seq, (STREAM_INIT, 0), population_size))
+        evals = evaluate(population)
+        F = objective_matrix(evals, objectives)
+        rank = non_dominated_sort(F)
+        crowd = crowding_distance(F, rank)
+
+        history = []
+        for gen in range(generations):
+            rngs = slot_rngs(seed_seq, (STREAM_CHILD, gen), population_size)
+            parents = _crowded_tournament(rank, crowd, 2 * population_size, [g for g in rngs for _ in range(2)])
+            parents = parents.reshape(-1, 2)
+            children = crossover_population(population[parents[:, 0]], population[parents[:, 1]], rngs)
+            children = mutate_population(children, mutation_rate, rngs)
+            child_evals = evaluate(children)
+
+            # (mu + lambda): pais + filhos disputam as vagas
+            union = np.vstack([population, children])
+            union_evals = evals + child_evals
+            union_F = np.vstack([F, objective_matrix(child_evals, objectives)])
+            keep, rank, crowd = _select_survivors(union_F, population_size)
+
+            population = union[keep]
+            evals = [union_evals[i] for i in keep]
+            F = union_F[keep]
+
+            front = rank == 0
+            best = {key: float(sense * (-F[front, j]).max()) for j, (key, sense) in enumerate(objectives)}
+            history.append({"front_size": int(front.sum()), "best": best})
+            print(
+                f"Geração {gen+1}/{generations} | frente: {front.sum()} | "
+                + " | ".join(f"{k}: {v:.2f}" for k, v in best.items())
+            )
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    # frente final, sem genomas repetidos, ordenada pelo 1º objetivo
+    idx = np.flatnonzero(rank == 0)
+    idx = idx[np.argsort(F[idx, 0], kind="stable")]
+    _, first = np.unique(population[idx], axis=0, return_index=True)
+    idx = idx[np.sort(first)]
+    front = [{"genome": row_to_genome(population[i]), **evals[i]} for i in idx]
+    return front, history
@@ -0,0 +1,130 @@
+# evolution/parallel.py
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from core.market import PreparedMarketData
+from core.shared_arrays import SharedArrays, attach_arrays
+
+# dados do worker: views da memória compartilhada, abertas UMA vez no initializer
+_WORKER_MARKET = None
+_WORKER_SHARED = None  # segmento aberto (mantém as views válidas)
+
+
+def _init_worker(spec):
+    global _WORKER_MARKET, _WORKER_SHARED
+    _WORKER_SHARED, arrays = attach_arrays(spec)
+    _WORKER_MARKET = PreparedMarketData.from_arrays(arrays)
+
+
+def worker_market():
+    """PreparedMarketData do dataset base, dentro de um worker do pool."""
+    return _WORKER_MARKET
+
+
+def _evaluate_task(task):
+    # import tardio: evolution.ga importa este módulo
+    from evolution.ga import evaluate_genome
+
+    genome, start, stop, fee = task
+    market = _WORKER_MARKET.window(start, stop)
+    # caminho só de métricas: nada de curva/trades para serializar de volta
+    return evaluate_genome(genome, None, None, fee, market=market, full=False)
+
+
+def _evaluate_resumable_task(task):
+    from evolution.ga import _evaluate_metrics_only
+
+    genome, start, stop, fee, resume = task
+    market = _WORKER_MARKET.window(start, stop)
+    return _evaluate_metrics_only(genome, market, fee, resume=resume, snapshot=True)
+
+
+class EvaluationPool(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor dono do segmento de memória compartilhada com o
+    dataset preparado; shutdown() (ou o fim do 'with') também o libera.
+
+    Guarda o nº de workers ('n_workers') e o fingerprint do dataset base
+    ('fingerprint') para quem recebe o pool pronto conferir os dados.
+    """
+
+    def __init__(self, shared, fingerprint, max_workers=None):
+        self.n_workers = max_workers or os.cpu_count() or 1
+        self.fingerprint = fingerprint
+        super().__init__(
+            max_workers=self.n_workers,
+            initializer=_init_worker,
+            initargs=(shared.spec,),
+        )
+        self._shared = shared
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+        if wait:
+            # sem wait, algum worker ainda pode abrir o segmento: fica para o
+            # finalizador do SharedArrays
+            self._shared.close()
+
+
+def make_evaluation_pool(market, n_workers=None):
+    """
+    Cria um pool de processos para avaliar genomas sobre 'market'.
+
+    O dataset base é preparado uma vez aqui (retornos, ordem dos retornos,
+    RangeIndex) e publicado num SharedArrays: os workers só abrem views
+    somente-leitura, sem cópia nem recálculo, então a memória não cresce
+    com o nº de workers. Cada task carrega só o genoma e os limites da
+    janela, e o mesmo pool serve para qualquer janela do mesmo dataset.
+    """
+    base = market.base()
+    shared = SharedArrays(base.arrays())
+    try:
+        return EvaluationPool(shared, base.fingerprint, max_workers=n_workers)
+    except Exception:
+        shared.close()
+        raise
+
+
+def check_evaluation_pool(executor, market):
+    """
+    Confere que 'executor' é um pool de make_evaluation_pool sobre o mesmo
+    dataset base de 'market' (os workers só conhecem esse dataset; uma
+    janela de outro daria avaliações erradas sem erro nenhum).
+    """
+    fingerprint = getattr(executor, "fingerprint", None)
+    if fingerprint is None:
+        raise TypeError("executor precisa ser criado com make_evaluation_pool")
+    if fingerprint != market.base().fingerprint:
+        raise ValueError("executor foi criado com outro dataset base (fingerprint diferente)")
+
+
+def submit_evaluation(executor, genome, market, fee):
+    """
+    Envia uma avaliação (caminho só de métricas) ao pool e devolve o
+    Future; para quem consome os resultados um a um, como o GA
+    steady-state.
+    """
+    return executor.submit(_evaluate_task, (genome, market.start, market.stop, fee))
+
+
+def evaluate_many(genomes, market, fee, executor, resumes=None):
+    """
+    Avalia uma lista de genomas no pool, devolvendo na mesma ordem.
+    As avaliações voltam sem a chave "result".
+
+    Com 'resumes' (snapshot ou None por genoma) cada backtest retoma do seu
+    snapshot e cada item volta como (avaliação, snapshot desta janela).
+    """
+    if not genomes:
+        return []
+
+    if resumes is None:
+        func = _evaluate_task
+        tasks = [(g, market.start, market.stop, fee) for g in genomes]
+    else:
+        func = _evaluate_resumable_task
+        tasks = [(g, market.start, market.stop, fee, r) for g, r in zip(genomes, resumes)]
+    chunksize = max(1, math.ceil(len(tasks) / (4 * executor.n_workers)))
+    return list(executor.map(func, tasks, chunksize=chunksize))
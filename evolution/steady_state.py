@@ -0,0 +1,179 @@
+# evolution/steady_state.py
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+import numpy as np
+
+from core.market import PreparedMarketData
+from evolution.cache import FitnessCache
+from evolution.ga import STREAM_CHILD, STREAM_INIT, evaluate_genome, tournament_selection
+from evolution.genome import crossover_population, mutate_population, random_population, row_to_genome, slot_rngs
+from evolution.parallel import check_evaluation_pool, make_evaluation_pool, submit_evaluation
+
+# avaliações em andamento no modo reproducible quando 'in_flight' não é
+# passado: fixo, para o resultado não depender do nº de workers
+REPRODUCIBLE_IN_FLIGHT = 8
+
+
+def run_steady_state_ga(
+    Px, Py,
+    population_size=150,
+    max_evaluations=9000,
+    mutation_rate=1,
+    tournament_size=3,
+    fee=0.0005,
+    seed=42,
+    market=None,
+    cache_size=4096,
+    n_workers=None,
+    executor=None,
+    in_flight=None,
+    reproducible=False,
+    report_every=None,
+):
+    """
+    GA steady-state assíncrono: sem gerações. O pool fica sempre com
+    'in_flight' avaliações em andamento (padrão: 2 por worker); assim que
+    uma volta, o filho entra no lugar do pior da população (se for melhor
+    que ele) e um novo filho (torneio + crossover + mutação sobre a
+    população atual) é despachado. Genomas caros (max_hold longo, muitas
+    trades) não seguram os outros workers.
+
+    reproducible=True: os resultados são consumidos na ordem de envio (não
+    na de chegada), então o resultado só depende de seed e 'in_flight' --
+    igual em série ou com qualquer nº de workers. Nesse modo o padrão de
+    'in_flight' é fixo (REPRODUCIBLE_IN_FLIGHT), não 2 por worker; com
+    muitos workers, passe um 'in_flight' maior (e o mesmo em todas as
+    execuções que devem bater). No modo rápido a ordem de chegada decide,
+    e o resultado pode variar entre execuções. O
+    c-ésimo filho é sempre sorteado pelo mesmo stream (seed, c), como os
+    slots do run_ga.
+
+    Para ao atingir 'max_evaluations' avaliações (incluindo a população
+    inicial; hits do cache contam). Mostra avaliações/segundo a cada
+    'report_every' avaliações (padrão: population_size).
+
+    Retorna (best, history) como o run_ga; history tem o melhor fitness a
+    cada population_size avaliações (uma "geração" equivalente).
+    """
+    if market is None:
+        market = PreparedMarketData(Px, Py)
+
+    cache = FitnessCache(maxsize=cache_size) if cache_size > 0 else None
+    seed_seq = np.random.SeedSequence(seed)
+    report_every = report_every or population_size
+
+    own_executor = executor is None and n_workers is not None and n_workers > 1
+    if own_executor:
+        executor = make_evaluation_pool(market, n_workers)
+    elif executor is not None:
+        check_evaluation_pool(executor, market)
+
+    if in_flight is None:
+        if reproducible:
+            in_flight = REPRODUCIBLE_IN_FLIGHT
+        else:
+            in_flight = 2 * (executor.n_workers if executor is not None else 1)
+
+    population = random_population(population_size, slot_rngs(seed_seq, (STREAM_INIT, 0), population_size))
+    evals = [None] * population_size
+    fitness = np.full(population_size, -np.inf)
+    history = []
+    n_done = 0
+    n_children = 0
+    t0 = time.perf_counter()
+
+    # avaliações pendentes, na ordem de envio: (slot, genes, chave do cache, valor)
+    # valor: Future do pool, avaliação já pronta (cache) ou None (serial, avalia ao consumir)
+    pending = deque()
+
+    def submit(slot, row):
+        genome = row_to_genome(row)
+        key = cache.key(genome, market.fingerprint, fee) if cache is not None else None
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None or executor is None:
+            pending.append((slot, row, key, hit))
+        else:
+            pending.append((slot, row, key, submit_evaluation(executor, genome, market, fee)))
+
+    def next_child():
+        nonlocal n_children
+        rng = slot_rngs(seed_seq, (STREAM_CHILD, n_children), 1)
+        n_children += 1
+        parents = tournament_selection(fitness, tournament_size, 2, rng * 2)
+        child = crossover_population(population[parents[:1]], population[parents[1:]], rng)
+        return mutate_population(child, mutation_rate, rng)[0]
+
+    def take():
+        """Próxima avaliação concluída: a mais antiga (reproducible) ou a primeira a chegar."""
+        if reproducible or executor is None:
+            return pending.popleft()
+        futures = [item[3] for item in pending if isinstance(item[3], Future)]
+        if len(futures) == len(pending):
+            wait(futures, return_when=FIRST_COMPLETED)
+        for i, item in enumerate(pending):
+            if not isinstance(item[3], Future) or item[3].done():
+                del pending[i]
+                return item
+
+    def resolve(item):
+        slot, row, key, value = item
+        if value is None:
+            value = evaluate_genome(row_to_genome(row), None, None, fee, market=market, full=False)
+        elif isinstance(value, Future):
+            value = value.result()
+        if cache is not None and key is not None:
+            cache.put(key, value)
+        return slot, row, value
+
+    try:
+        # 1) população inicial: cada slot recebe sua própria avaliação
+        for slot in range(population_size):
+            submit(slot, population[slot])
+        initial_left = population_size
+
+        while pending:
+            slot, row, eval_res = resolve(take())
+            n_done += 1
+
+            if slot is not None:
+                # população inicial
+                evals[slot] = eval_res
+                fitness[slot] = eval_res["fitness"]
+                initial_left -= 1
+            else:
+                # 2) replace-worst
+                worst = int(np.argmin(fitness))
+                if eval_res["fitness"] > fitness[worst]:
+                    population[worst] = row
+                    evals[worst] = eval_res
+                    fitness[worst] = eval_res["fitness"]
+
+            if n_done % population_size == 0:
+                history.append(float(fitness.max()))
+
+            if n_done % report_every == 0:
+                elapsed = time.perf_counter() - t0
+                print(
+                    f"Avaliações {n_done}/{max_evaluations} | "
+                    f"{n_done / elapsed:.1f} aval/s | "
+                    f"melhor: {fitness.max():.2f}"
+                )
+
+            # 3) mantém o pool cheio: um filho novo por avaliação consumida
+            if initial_left == 0:
+                while len(pending) < in_flight and n_done + len(pending) < max_evaluations:
+                    submit(None, next_child())
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - t0
+    print(f"[INFO] {n_done} avaliações em {elapsed:.1f}s ({n_done / elapsed:.1f} aval/s).")
+
+    # avaliações do GA não trazem "result" (curva + trades): refaz só a do melhor
+    best_genome = row_to_genome(population[int(np.argmax(fitness))])
+    best = {"genome": best_genome, **evaluate_genome(best_genome, None, None, fee, market=market)}
+    return best, history
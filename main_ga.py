@@ -10,6 +10,8 @@
 #    python analyze_signals.py -> analisa os sinais gerados pelo realtime_signal.py e ve se ele foi condizente com as expectativas ou não
 
 # main_ga.py
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -38,6 +40,8 @@ if __name__ == "__main__":
         generations=200,
         fee=0.0005,
         seed=42,
+        # opt-in: GA_CHECKPOINT=ga_checkpoint.npz retoma daqui se o processo cair
+        checkpoint_path=os.environ.get("GA_CHECKPOINT") or None,
     )
 
 
@@ -0,0 +1,154 @@
+# main_scan_pairs.py
+"""
+Varredura de pares lead-lag no universo do IBOV.
+
+1) Carrega os fechamentos de todos os tickers (cache local, uma chamada
+   em lote ao Yahoo para o que faltar) e alinha num calendário comum.
+2) Triagem: correlação cruzada defasada (lags 0..3) de TODOS os pares
+   ordenados de uma vez, via FFT (core/pairs.py).
+3) Roda um GA curto só nos top-K pares, em paralelo (um par por task; o
+   painel de preços fica em memória compartilhada, lido sem cópia pelos
+   workers).
+4) Salva a tabela ranqueada em pairs_scan.csv.
+"""
+
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from core.market import PreparedMarketData
+from core.pairs import panel_returns, screen_pairs
+from core.shared_arrays import SharedArrays, attach_arrays
+from data.loaders import align_panel
+from data.price_cache import load_close_many
+from evolution.ga import run_ga
+
+# Ações líquidas da carteira do IBOV
+IBOV_TICKERS = [
+    "ABEV3.SA", "ALOS3.SA", "ASAI3.SA", "AZUL4.SA", "B3SA3.SA", "BBAS3.SA",
+    "BBDC3.SA", "BBDC4.SA", "BBSE3.SA", "BEEF3.SA", "BPAC11.SA", "BRAP4.SA",
+    "BRFS3.SA", "BRKM5.SA", "CMIG4.SA", "CMIN3.SA", "COGN3.SA", "CPFE3.SA",
+    "CPLE6.SA", "CRFB3.SA", "CSAN3.SA", "CSNA3.SA", "CVCB3.SA", "CYRE3.SA",
+    "EGIE3.SA", "ELET3.SA", "ELET6.SA", "EMBR3.SA", "ENEV3.SA", "ENGI11.SA",
+    "EQTL3.SA", "EZTC3.SA", "FLRY3.SA", "GGBR4.SA", "GOAU4.SA", "HAPV3.SA",
+    "HYPE3.SA", "IGTI11.SA", "IRBR3.SA", "ITSA4.SA", "ITUB4.SA", "KLBN11.SA",
+    "LREN3.SA", "MGLU3.SA", "MRFG3.SA", "MRVE3.SA", "MULT3.SA", "NTCO3.SA",
+    "PCAR3.SA", "PETR3.SA", "PETR4.SA", "PETZ3.SA", "PRIO3.SA", "RADL3.SA",
+    "RAIL3.SA", "RAIZ4.SA", "RDOR3.SA", "RENT3.SA", "SANB11.SA", "SBSP3.SA",
+    "SLCE3.SA", "SMTO3.SA", "SUZB3.SA", "TAEE11.SA", "TIMS3.SA", "TOTS3.SA",
+    "UGPA3.SA", "USIM5.SA", "VALE3.SA", "VBBR3.SA", "VIVT3.SA", "WEGE3.SA",
+    "YDUQ3.SA",
+]
+
+# painel do worker: view somente-leitura do segmento compartilhado
+_WORKER_PRICES = None
+_WORKER_SHARED = None
+
+
+def _init_worker(spec):
+    global _WORKER_PRICES, _WORKER_SHARED
+    _WORKER_SHARED, arrays = attach_arrays(spec)
+    _WORKER_PRICES = arrays["prices"]
+
+
+def _run_pair_ga(task):
+    i, j, ga_params = task
+    market = PreparedMarketData(_WORKER_PRICES[:, i], _WORKER_PRICES[:, j])
+
+    # o log por geração de N GAs em paralelo só embaralharia a saída
+    with contextlib.redirect_stdout(io.StringIO()):
+        best, history = run_ga(None, None, market=market, **ga_params)
+
+    return {
+        "genome": best["genome"],
+        "fitness": best["fitness"],
+        "total_return_pct": best["total_return_pct"],
+        "mdd_pct": best["mdd_pct"],
+        "calmar": best["calmar"],
+        "sortino": best["sortino"],
+        "n_trades": best["n_trades"],
+    }
+
+
+def load_universe(tickers, period="10y", min_coverage=0.9, offline=None):
+    """
+    Painel alinhado do universo. Tickers sem dados (ex.: deslistados, que
+    o Yahoo devolve vazios) ou com histórico curto (menos de min_coverage
+    do mais longo) ficam de fora, para o join não encolher o calendário de
+    todo mundo.
+    """
+    series = load_close_many(tickers, period=period, offline=offline)
+    longest = max(len(s) for s in series.values())
+    if longest == 0:
+        raise RuntimeError("ERRO: nenhum ticker do universo retornou dados.")
+    kept = [t for t in tickers if len(series[t]) >= min_coverage * longest]
+
+    dropped = sorted(set(tickers) - set(kept))
+    if dropped:
+        print(f"[INFO] {len(dropped)} tickers fora (sem dados ou histórico curto): {dropped}")
+
+    prices, dates = align_panel(series, kept)
+    return prices, dates, kept
+
+
+def scan_pairs(
+    prices,
+    tickers,
+    top_k=20,
+    max_lag=3,
+    population_size=60,
+    generations=30,
+    fee=0.0005,
+    seed=42,
+    n_workers=None,
+):
+    """
+    Triagem por correlação cruzada + GA curto nos top_k pares.
+    Retorna um DataFrame ranqueado pelo fitness do GA.
+    """
+    rets = panel_returns(prices)
+    candidates = screen_pairs(rets, tickers, max_lag=max_lag, top_k=top_k)
+    print(f"[INFO] {len(tickers) * (len(tickers) - 1)} pares triados; GA nos {len(candidates)} melhores.")
+
+    ga_params = {
+        "population_size": population_size,
+        "generations": generations,
+        "fee": fee,
+        "seed": seed,
+    }
+    tasks = [(c["leader_idx"], c["follower_idx"], ga_params) for c in candidates]
+
+    with SharedArrays({"prices": prices}) as shared, ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_worker,
+        initargs=(shared.spec,),
+    ) as executor:
+        results = list(executor.map(_run_pair_ga, tasks))
+
+    rows = []
+    for cand, res in zip(candidates, results):
+        row = {k: v for k, v in cand.items() if not k.endswith("_idx")}
+        row.update({k: v for k, v in res.items() if k != "genome"})
+        row.update(res["genome"])
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        table = table.sort_values("fitness", ascending=False).reset_index(drop=True)
+    return table
+
+
+if __name__ == "__main__":
+    prices, dates, tickers = load_universe(IBOV_TICKERS, period="10y")
+    print(f"[INFO] Painel: {prices.shape[0]} pregões x {prices.shape[1]} tickers "
+          f"({dates[0].date()} a {dates[-1].date()})")
+
+    table = scan_pairs(prices, tickers, top_k=20)
+
+    print("\n=== RANKING DE PARES (líder -> seguidor) ===")
+    print(table.to_string(index=False))
+
+    table.to_csv("pairs_scan.csv", index=False)
+    print("\n[INFO] Tabela salva em pairs_scan.csv")
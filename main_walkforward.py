@@ -2,9 +2,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import json
+import os
 
 from data.loaders import load_brazil_stocks
-from evolution.ga import run_ga, evaluate_genome
+from core.market import PreparedMarketData
+from evolution.ga import run_ga, evaluate_genome, select_elites
+from evolution.parallel import make_evaluation_pool, worker_market
 
 
 def walkforward_deslizante(
@@ -16,6 +19,12 @@ def walkforward_deslizante(
     generations=40,
     fee=0.0005,
     seed_base=42,
+    market=None,
+    n_workers=None,
+    checkpoint_dir=None,
+    warm_start=False,
+    immigrant_frac=0.3,
+    early_stop=None,
 ):
     """
     Walk-forward deslizante:
@@ -23,16 +32,164 @@ def walkforward_deslizante(
     - Janela de teste:  test_years
     - Anda para frente pelo tamanho da janela de teste.
 
+    Os dados são preparados uma vez (ou vêm prontos em 'market') e cada
+    janela é só uma view do PreparedMarketData, sem cópia.
+
+    Com n_workers > 1 as janelas (independentes, cada uma com a sua seed
+    seed_base + wf_idx) rodam em paralelo; ver iter_walkforward.
+
+    Com 'checkpoint_dir' o progresso fica salvo em disco: janelas já
+    concluídas são puladas numa nova execução e a janela interrompida
+    continua do último checkpoint do GA (ver iter_walkforward).
+
+    warm_start=True semeia o GA de cada janela com a elite final da janela
+    anterior (os treinos se sobrepõem quase inteiros) mais uma fração
+    'immigrant_frac' de imigrantes aleatórios; com early_stop=K cada janela
+    para após K gerações sem melhora. Juntos, cortam boa parte das
+    gerações do walk-forward.
+
     Retorna:
         wf_results (lista de dicts com treino/teste por janela)
     """
-    n = len(Px)
+    return list(iter_walkforward(
+        Px,
+        Py,
+        train_years=train_years,
+        test_years=test_years,
+        population_size=population_size,
+        generations=generations,
+        fee=fee,
+        seed_base=seed_base,
+        market=market,
+        n_workers=n_workers,
+        checkpoint_dir=checkpoint_dir,
+        warm_start=warm_start,
+        immigrant_frac=immigrant_frac,
+        early_stop=early_stop,
+    ))
+
+
+def iter_walkforward(
+    Px,
+    Py,
+    train_years=2,
+    test_years=1,
+    population_size=120,
+    generations=40,
+    fee=0.0005,
+    seed_base=42,
+    market=None,
+    n_workers=None,
+    checkpoint_dir=None,
+    warm_start=False,
+    immigrant_frac=0.3,
+    early_stop=None,
+):
+    """
+    Gera os resultados do walk-forward janela a janela, em ordem.
+
+    Em paralelo (n_workers > 1) cada janela vira uma task num pool de
+    processos (preços enviados uma vez por worker); os resultados saem na
+    ordem das janelas assim que ficam prontos, e o tempo total tende ao da
+    janela mais lenta.
+
+    Checkpoint (opcional): em 'checkpoint_dir' cada janela concluída grava
+    wf_XXX.json (genoma + histórico do treino) e a janela em andamento
+    grava o checkpoint do GA em wf_XXX_ga.npz. Numa nova execução com os
+    mesmos parâmetros, janelas concluídas só reavaliam o genoma salvo
+    (mesmo resultado, sem rodar o GA) e a interrompida retoma do .npz.
+
+    Warm start: cada janela depende da anterior, então as janelas rodam em
+    sequência; com n_workers > 1 o pool paraleliza as avaliações dentro de
+    cada GA. A elite vai junto no wf_XXX.json para a retomada continuar
+    semeando a próxima janela.
+    """
+    if market is None:
+        market = PreparedMarketData(Px, Py)
+
+    windows = _wf_windows(len(market), train_years, test_years)
+    params = {
+        "population_size": population_size,
+        "generations": generations,
+        "fee": fee,
+        "seed_base": seed_base,
+        "warm_start": warm_start,
+        "immigrant_frac": immigrant_frac,
+        "early_stop": early_stop,
+    }
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    finished = {}
+    for window in windows:
+        saved = _load_wf_checkpoint(checkpoint_dir, window, params, market)
+        if saved is not None:
+            finished[window] = saved
+
+    if warm_start:
+        yield from _iter_warm_walkforward(market, windows, finished, params, n_workers, checkpoint_dir)
+        return
+
+    if n_workers is None or n_workers <= 1 or len(windows) - len(finished) <= 1:
+        for window in windows:
+            if window in finished:
+                result = _finished_wf_window(market, window, finished[window], fee)
+            else:
+                result = _run_wf_window(market, window, checkpoint_dir=checkpoint_dir, **params)
+            _print_wf_result(result)
+            yield result
+        return
+
+    todo = [window for window in windows if window not in finished]
+    tasks = [(market.start, market.stop, window, params, checkpoint_dir) for window in todo]
+    with make_evaluation_pool(market, min(n_workers, len(todo))) as executor:
+        # map devolve na ordem das janelas, conforme elas terminam
+        running = executor.map(_run_wf_window_task, tasks)
+        for window in windows:
+            if window in finished:
+                result = _finished_wf_window(market, window, finished[window], fee)
+            else:
+                result = next(running)
+            _print_wf_result(result)
+            yield result
+
+
+def _iter_warm_walkforward(market, windows, finished, params, n_workers, checkpoint_dir):
+    """Janelas em sequência, cada GA semeado com a elite da anterior."""
+    executor = None
+    if n_workers is not None and n_workers > 1:
+        executor = make_evaluation_pool(market, n_workers)
+
+    try:
+        seed_population = None
+        for window in windows:
+            if window in finished:
+                result = _finished_wf_window(market, window, finished[window], params["fee"])
+            else:
+                result = _run_wf_window(
+                    market,
+                    window,
+                    checkpoint_dir=checkpoint_dir,
+                    seed_population=seed_population,
+                    executor=executor,
+                    **params,
+                )
+            seed_population = result.get("elite_population")
+            _print_wf_result(result)
+            yield result
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _wf_windows(n, train_years, test_years):
+    """Lista de (wf_idx, start_train, end_train, end_test)."""
     dias_por_ano = 252  # aproximado
 
     train_len = train_years * dias_por_ano
     test_len = test_years * dias_por_ano
 
-    wf_results = []
+    windows = []
     wf_idx = 0
 
     start_train = 0
@@ -44,58 +201,193 @@ def walkforward_deslizante(
             break  # acabou o histórico para outra janela completa
 
         wf_idx += 1
-        print(f"\n=== WF #{wf_idx} | treino [{start_train}:{end_train}] teste [{end_train}:{end_test}] ===")
-
-        Px_train = Px[start_train:end_train]
-        Py_train = Py[start_train:end_train]
-
-        Px_test = Px[end_train:end_test]
-        Py_test = Py[end_train:end_test]
-
-        # --- GA no TREINO ---
-        best_train, history_train = run_ga(
-            Px_train,
-            Py_train,
-            population_size=population_size,
-            generations=generations,
-            fee=fee,
-            seed=seed_base + wf_idx,
-        )
-
-        print("\n> Melhor indivíduo no TREINO:")
-        print("Genoma:", best_train["genome"])
-        print("Fitness treino:", best_train["fitness"])
-        print("Retorno treino (%):", best_train["total_return_pct"])
-        print("MDD treino (%):", best_train["mdd_pct"])
-        print("Calmar treino:", best_train["calmar"])
-        print("Sortino treino:", best_train["sortino"])
-        print("N trades treino:", best_train["n_trades"])
-
-        # --- Aplica mesmo genoma no TESTE ---
-        eval_test = evaluate_genome(best_train["genome"], Px_test, Py_test, fee=fee)
-
-        print("\n> Desempenho no TESTE (sem reotimizar):")
-        print("Retorno teste (%):", eval_test["total_return_pct"])
-        print("MDD teste (%):", eval_test["mdd_pct"])
-        print("Calmar teste:", eval_test["calmar"])
-        print("Sortino teste:", eval_test["sortino"])
-        print("N trades teste:", eval_test["n_trades"])
-        print("Retornos por janela teste:", eval_test["window_returns"])
-
-        wf_results.append({
-            "wf_idx": wf_idx,
-            "start_train": start_train,
-            "end_train": end_train,
-            "end_test": end_test,
-            "best_train": best_train,
-            "history_train": history_train,
-            "eval_test": eval_test,
-        })
+        windows.append((wf_idx, start_train, end_train, end_test))
 
         # anda a janela pelo tamanho do bloco de teste
         start_train += test_len
 
-    return wf_results
+    return windows
+
+
+def _run_wf_window(
+    market,
+    window,
+    population_size,
+    generations,
+    fee,
+    seed_base,
+    warm_start=False,
+    immigrant_frac=0.3,
+    early_stop=None,
+    checkpoint_dir=None,
+    seed_population=None,
+    executor=None,
+):
+    wf_idx, start_train, end_train, end_test = window
+    print(f"\n=== WF #{wf_idx} | treino [{start_train}:{end_train}] teste [{end_train}:{end_test}] ===")
+    if seed_population is not None:
+        print(f"[INFO] Warm start: {len(seed_population)} indivíduos da janela anterior.")
+
+    market_train = market.window(start_train, end_train)
+    market_test = market.window(end_train, end_test)
+
+    ga_checkpoint = None
+    if checkpoint_dir is not None:
+        ga_checkpoint = os.path.join(checkpoint_dir, f"wf_{wf_idx:03d}_ga.npz")
+
+    # --- GA no TREINO ---
+    best_train, history_train, state = run_ga(
+        None,
+        None,
+        population_size=population_size,
+        generations=generations,
+        fee=fee,
+        seed=seed_base + wf_idx,
+        market=market_train,
+        executor=executor,
+        checkpoint_path=ga_checkpoint,
+        early_stop=early_stop,
+        initial_population=seed_population,
+        return_state=True,
+    )
+
+    # elite final (sem os imigrantes) para semear a próxima janela
+    elite_population = None
+    if warm_start:
+        n_elite = max(1, population_size - int(round(immigrant_frac * population_size)))
+        elite_population = state["population"][select_elites(state["fitness"], n_elite)]
+
+    # --- Aplica mesmo genoma no TESTE ---
+    eval_test = evaluate_genome(best_train["genome"], None, None, fee=fee, market=market_test)
+
+    if checkpoint_dir is not None:
+        _save_wf_checkpoint(
+            checkpoint_dir,
+            window,
+            {
+                "population_size": population_size,
+                "generations": generations,
+                "fee": fee,
+                "seed_base": seed_base,
+                "warm_start": warm_start,
+                "immigrant_frac": immigrant_frac,
+                "early_stop": early_stop,
+            },
+            best_train["genome"],
+            history_train,
+            market_train.fingerprint,
+            elite_population,
+        )
+        os.remove(ga_checkpoint)  # janela concluída: o estado do GA não serve mais
+
+    return {
+        "wf_idx": wf_idx,
+        "start_train": start_train,
+        "end_train": end_train,
+        "end_test": end_test,
+        "best_train": best_train,
+        "history_train": history_train,
+        "eval_test": eval_test,
+        "elite_population": elite_population,
+    }
+
+
+def _run_wf_window_task(task):
+    start, stop, window, params, checkpoint_dir = task
+    market = worker_market().window(start, stop)
+    return _run_wf_window(market, window, checkpoint_dir=checkpoint_dir, **params)
+
+
+def _wf_checkpoint_path(checkpoint_dir, window):
+    return os.path.join(checkpoint_dir, f"wf_{window[0]:03d}.json")
+
+
+def _save_wf_checkpoint(checkpoint_dir, window, params, genome, history_train, fingerprint, elite_population=None):
+    path = _wf_checkpoint_path(checkpoint_dir, window)
+    saved = {
+        "window": list(window),
+        "params": params,
+        "fingerprint": fingerprint,
+        "genome": genome,
+        "history_train": [float(h) for h in history_train],
+    }
+    if elite_population is not None:
+        saved["elite_population"] = elite_population.tolist()
+
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(saved, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _load_wf_checkpoint(checkpoint_dir, window, params, market):
+    """
+    Janela concluída salva em disco (ou None se não houver / não bater).
+
+    Além de índices e parâmetros, confere o fingerprint dos dados do
+    treino: com period="10y" e o cache incremental os mesmos índices
+    cobrem outras datas a cada dia, e o genoma salvo não vale mais.
+    """
+    if checkpoint_dir is None:
+        return None
+    path = _wf_checkpoint_path(checkpoint_dir, window)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    if saved["window"] != list(window) or saved["params"] != params:
+        return None
+    _, start_train, end_train, _ = window
+    if saved.get("fingerprint") != market.window(start_train, end_train).fingerprint:
+        print(f"[INFO] Checkpoint {path} é de outros dados; a janela roda de novo.")
+        return None
+    return saved
+
+
+def _finished_wf_window(market, window, saved, fee):
+    """Resultado de uma janela já concluída: só reavalia o genoma salvo."""
+    wf_idx, start_train, end_train, end_test = window
+    print(f"\n=== WF #{wf_idx} | já concluída (checkpoint), sem rodar o GA ===")
+
+    genome = saved["genome"]
+    best_train = {
+        "genome": genome,
+        **evaluate_genome(genome, None, None, fee=fee, market=market.window(start_train, end_train)),
+    }
+    eval_test = evaluate_genome(genome, None, None, fee=fee, market=market.window(end_train, end_test))
+
+    return {
+        "wf_idx": wf_idx,
+        "start_train": start_train,
+        "end_train": end_train,
+        "end_test": end_test,
+        "best_train": best_train,
+        "history_train": saved["history_train"],
+        "eval_test": eval_test,
+        "elite_population": np.array(saved["elite_population"]) if "elite_population" in saved else None,
+    }
+
+
+def _print_wf_result(result):
+    best_train = result["best_train"]
+    eval_test = result["eval_test"]
+
+    print(f"\n> Melhor indivíduo no TREINO (WF #{result['wf_idx']}):")
+    print("Genoma:", best_train["genome"])
+    print("Fitness treino:", best_train["fitness"])
+    print("Retorno treino (%):", best_train["total_return_pct"])
+    print("MDD treino (%):", best_train["mdd_pct"])
+    print("Calmar treino:", best_train["calmar"])
+    print("Sortino treino:", best_train["sortino"])
+    print("N trades treino:", best_train["n_trades"])
+
+    print("\n> Desempenho no TESTE (sem reotimizar):")
+    print("Retorno teste (%):", eval_test["total_return_pct"])
+    print("MDD teste (%):", eval_test["mdd_pct"])
+    print("Calmar teste:", eval_test["calmar"])
+    print("Sortino teste:", eval_test["sortino"])
+    print("N trades teste:", eval_test["n_trades"])
+    print("Retornos por janela teste:", eval_test["window_returns"])
 
 
 if __name__ == "__main__":
@@ -125,6 +417,8 @@ if __name__ == "__main__":
         generations=40,
         fee=0.0005,
         seed_base=100,
+        # opt-in: WF_CHECKPOINT_DIR=wf_checkpoints pula as janelas prontas ao reexecutar
+        checkpoint_dir=os.environ.get("WF_CHECKPOINT_DIR") or None,
     )
 
     if not wf_results:
@@ -4,15 +4,22 @@ Robô diário "quase em tempo real" usando o best_genome.json.
 
 Fluxo:
 - Lê best_genome.json (gerado pelo main_walkforward.py).
-- Baixa histórico recente de PETR4.SA (X) e VALE3.SA (Y).
-- Roda o backtest_lead_lag com o genoma atual até o último dia disponível.
-- Imprime um resumo no terminal (equity final, retorno, nº de trades).
-- Salva TODAS as trades simuladas em trades_log.csv (sobrescreve a cada execução).
-
-Observação importante:
-- Isto ainda é um "paper bot": ele recalcula o histórico inteiro até hoje,
-  não mantém estado incremental entre dias. Para os próximos ~10 dias de teste,
-  isso é excelente pra validar o comportamento real da estratégia.
+- Carrega o histórico de PETR4.SA (X) e VALE3.SA (Y) do cache local de
+  preços (baixando só os candles novos).
+- Retoma o estado salvo em bot_state.json (caixa, posição, entrada
+  planejada, trade aberta, último candle processado) e processa SÓ os
+  candles novos, com o mesmo laço do backtest_lead_lag (step_lead_lag).
+- Acrescenta as trades fechadas no dia em trades_log.csv.
+- Imprime um resumo no terminal (caixa, posição, equity marcada a mercado).
+
+Replay completo (reprocessa ~10 anos e reescreve trades_log.csv) só quando:
+- não existe estado salvo;
+- o genoma (ou a taxa) mudou;
+- o histórico salvo não bate mais com o do cache (revisão de dados).
+
+Diferença para o backtest: aqui a série está "aberta", então nada é
+fechado por fim de dados (EOD) e entradas planejadas para depois do
+último candle ficam pendentes para os próximos dias.
 """
 
 import json
@@ -21,9 +28,14 @@ import os
 from datetime import datetime
 
 import numpy as np
-import yfinance as yf
 
-from core.leadlag import backtest_lead_lag
+from core.leadlag import new_lead_lag_state, step_lead_lag
+from core.ledger import TradeLedger
+from core.returns import compute_returns
+from data.loaders import load_price_panel
+
+TICKERS = ["PETR4.SA", "VALE3.SA"]
+STATE_PATH = "bot_state.json"
 
 
 def load_best_genome(path="best_genome.json"):
@@ -32,118 +44,41 @@ def load_best_genome(path="best_genome.json"):
     return genome
 
 
-def load_prices_with_dates(ticker, period="10y", interval="1d"):
-    """
-    Baixa preços e retorna (prices, dates).
-    Funciona tanto com colunas simples quanto com MultiIndex (Price x Ticker),
-    que é o formato que você está recebendo no df.head().
-    """
-
-    df = yf.download(
-        ticker,
-        period=period,
-        interval=interval,
-        auto_adjust=False,  # evita surpresas com colunas
-        progress=False,
-    )
-
-    if df is None or df.empty:
-        raise RuntimeError(
-            f"ERRO: Yahoo Finance retornou DataFrame vazio para {ticker}."
-        )
-
-    # Se as colunas forem MultiIndex (como no seu caso):
-    #   nível 0: tipo de preço (Close, High, Low, Open, Volume)
-    #   nível 1: ticker (PETR4.SA, VALE3.SA)
-    cols = df.columns
-
-    import pandas as pd
-
-    # Caso MultiIndex
-    if isinstance(cols, pd.MultiIndex):
-        level0 = cols.get_level_values(0)
-
-        series = None
-
-        # tenta pegar 'Close' primeiro
-        if "Close" in level0:
-            close_df = df["Close"]  # isso vira um DataFrame com 1 coluna (ticker)
-            # pega a primeira coluna (ex.: PETR4.SA)
-            if isinstance(close_df, pd.DataFrame):
-                series = close_df.iloc[:, 0]
-            else:
-                series = close_df
-
-        # se não achar, tenta 'Adj Close'
-        elif "Adj Close" in level0:
-            adj_df = df["Adj Close"]
-            if isinstance(adj_df, pd.DataFrame):
-                series = adj_df.iloc[:, 0]
-            else:
-                series = adj_df
-
-        if series is None:
-            raise RuntimeError(
-                f"ERRO: Nenhuma coluna 'Close' ou 'Adj Close' encontrada num MultiIndex para {ticker}.\n"
-                f"Colunas disponíveis: {cols}"
-            )
-
-    # Caso colunas simples (não MultiIndex)
-    else:
-        if "Close" in cols:
-            series = df["Close"]
-        elif "Adj Close" in cols:
-            series = df["Adj Close"]
-        else:
-            raise RuntimeError(
-                f"ERRO: Nenhuma coluna de preço ('Close' ou 'Adj Close') encontrada para {ticker}.\n"
-                f"Colunas disponíveis: {cols.tolist()}"
-            )
-
-    # limpa NaN e transforma em vetor 1D
-    series = series.dropna()
-    prices = series.to_numpy(dtype=float).reshape(-1)
-    dates = series.index.to_pydatetime()
-
-    if len(prices) == 0:
-        raise RuntimeError(f"ERRO: Após dropna, {ticker} não tem preços válidos.")
-
-    return prices, dates
-
-
-
-
 def save_trades_csv(
     filepath,
     trades,
     dates,
     initial_cash,
     final_equity,
+    append=False,
 ):
     """
-    Salva todas as trades em CSV.
+    Salva trades em CSV.
     Cada linha = uma trade fechada.
-    Sobrescreve o arquivo inteiro a cada execução.
+    append=False sobrescreve o arquivo inteiro; append=True acrescenta no
+    fim (initial_cash = equity antes da primeira trade da lista).
     """
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
+    append = append and os.path.exists(filepath)
+    with open(filepath, "a" if append else "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
 
         # Cabeçalho
-        writer.writerow([
-            "entry_date",
-            "exit_date",
-            "entry_t",
-            "exit_t",
-            "entry_price",
-            "exit_price",
-            "size",
-            "fee_entry",
-            "fee_exit",
-            "pnl",
-            "pnl_pct",
-            "exit_reason",
-            "equity_after_trade",
-        ])
+        if not append:
+            writer.writerow([
+                "entry_date",
+                "exit_date",
+                "entry_t",
+                "exit_t",
+                "entry_price",
+                "exit_price",
+                "size",
+                "fee_entry",
+                "fee_exit",
+                "pnl",
+                "pnl_pct",
+                "exit_reason",
+                "equity_after_trade",
+            ])
 
         equity = initial_cash
 
@@ -183,89 +118,186 @@ def save_trades_csv(
             ])
 
 
+def _to_jsonable(value):
+    if isinstance(value, TradeLedger):
+        return _to_jsonable(value.to_dicts())
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)  # float -> JSON -> float é exato
+    return value
+
+
+def load_bot_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    strategy = state["strategy"]
+    strategy["trades"] = TradeLedger.from_dicts(strategy["trades"])
+    return state
+
+
+def save_bot_state(state, path=STATE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_to_jsonable(state), f, indent=2)
+    os.replace(tmp, path)
+
+
+def new_bot_state(genome, fee, start_date):
+    return {
+        "genome": genome,
+        "fee": fee,
+        "start_date": start_date,   # índice 0 da série usada nos índices t
+        "last_t": -1,               # último candle processado
+        "last_date": None,
+        "last_prices": None,        # (Px, Py) do último candle, para detectar revisões
+        "closed_equity": 1000.0,    # caixa inicial + PnL das trades fechadas
+        "strategy": new_lead_lag_state(),
+    }
+
+
+def _state_matches_history(state, Px, Py, dates):
+    last_t = state["last_t"]
+    if last_t < 0 or last_t >= len(dates):
+        return False
+    return (
+        dates[last_t].strftime("%Y-%m-%d") == state["last_date"]
+        and [float(Px[last_t]), float(Py[last_t])] == state["last_prices"]
+    )
+
+
 def main():
     print("=== REALTIME BOT: PETR4.SA (X) x VALE3.SA (Y) ===")
 
     # 1) Carrega genoma otimizado
     genome = load_best_genome("best_genome.json")
-    threshold = float(genome["threshold"])
-    tp = float(genome["tp"])
-    sl = float(genome["sl"])
-    lag = int(genome["lag"])
-    max_hold = int(genome["max_hold"])
+    params = {
+        "threshold": float(genome["threshold"]),
+        "tp": float(genome["tp"]),
+        "sl": float(genome["sl"]),
+        "lag": int(genome["lag"]),
+        "max_hold": int(genome["max_hold"]),
+    }
+    fee = 0.0005  # mesma taxa usada no GA
 
     print("\nGenoma usado:")
     print(genome)
 
-    # 2) Baixa histórico (por padrão, 10 anos diários)
-    Px, dates_x = load_prices_with_dates("PETR4.SA", period="10y", interval="1d")
-    Py, dates_y = load_prices_with_dates("VALE3.SA", period="10y", interval="1d")
-
-    # Garante que têm o mesmo tamanho (alinha pela cauda)
-    n = min(len(Px), len(Py))
-    Px = Px[-n:]
-    Py = Py[-n:]
-    dates = dates_x[-n:]  # assumindo calendário compatível
-
-    # 3) Roda backtest com o genoma atual
-    fee = 0.0005  # mesma taxa usada no GA
-    result = backtest_lead_lag(
-        Px,
+    # 2) Estado salvo -> só os candles novos; senão replay de 10 anos
+    state = load_bot_state()
+    replay_reason = None
+    if state is None:
+        replay_reason = "sem estado salvo"
+    elif state["genome"] != genome or state["fee"] != fee:
+        replay_reason = "genoma mudou"
+
+    if replay_reason is None:
+        # (alinhados por data: só os pregões em que os dois negociaram)
+        prices, dates = load_price_panel(
+            TICKERS,
+            start=state["start_date"],
+            interval="1d",
+            auto_adjust=False,
+        )
+        if not _state_matches_history(state, prices[:, 0], prices[:, 1], dates):
+            replay_reason = "histórico salvo não bate com o cache"
+
+    if replay_reason is not None:
+        print(f"\n[INFO] Replay completo ({replay_reason}).")
+        prices, dates = load_price_panel(
+            TICKERS,
+            period="10y",
+            interval="1d",
+            auto_adjust=False,
+        )
+        state = new_bot_state(genome, fee, dates[0].strftime("%Y-%m-%d"))
+
+    Px = prices[:, 0]
+    Py = prices[:, 1]
+    dates = dates.to_pydatetime()
+    T = len(Py)
+
+    # 3) Processa só [last_t + 1, T) com o mesmo laço do backtest
+    t_start = state["last_t"] + 1
+    strategy = state["strategy"]
+    step_lead_lag(
+        strategy,
+        compute_returns(Px),
         Py,
-        threshold=threshold,
-        lag=lag,
-        tp=tp,
-        sl=sl,
-        max_hold=max_hold,
+        t_start,
+        T,
         fee=fee,
+        horizon=None,  # série aberta: nada de EOD
+        **params,
     )
 
-    initial_cash = result["initial_cash"]
-    final_equity = result["final_equity"]
-    total_return_pct = result["total_return_pct"]
-    trades = result["trades"]
-    equity_curve = result["equity_curve"]
-
-    print("\n=== RESUMO DO BACKTEST ATÉ HOJE ===")
-    print(f"Data de hoje (aprox.): {datetime.now().date()}")
-    print(f"Capital inicial: {initial_cash:.2f}")
-    print(f"Capital final  : {final_equity:.2f}")
-    print(f"Retorno total (%): {total_return_pct:.2f}%")
-    print(f"Número de trades: {len(trades)}")
-
-    if len(equity_curve) > 0:
-        print(f"Equity mais recente (último dia): {float(equity_curve[-1]):.2f}")
-
-    # Mostra últimas 3 trades
-    print("\nÚltimas trades (até 3):")
-    for tr in trades[-3:]:
-        entry_t = tr["entry_t"]
-        exit_t = tr.get("exit_t", None)
-        entry_date = dates[entry_t].strftime("%Y-%m-%d") if entry_t is not None else "?"
-        exit_date = dates[exit_t].strftime("%Y-%m-%d") if exit_t is not None else "?"
+    trades = strategy["trades"].to_dicts()
+    closed = [tr for tr in trades if "exit_t" in tr]
+    strategy["trades"] = TradeLedger.from_dicts([tr for tr in trades if "exit_t" not in tr])
 
-        print({
-            "entry_date": entry_date,
-            "exit_date": exit_date,
-            "entry_price": tr["entry_price"],
-            "exit_price": tr.get("exit_price", None),
-            "pnl": tr.get("pnl", 0.0),
-            "exit_reason": tr.get("exit_reason", ""),
-        })
-
-    # 4) Salva TODAS as trades no CSV
+    # 4) Trades fechadas -> CSV (acrescenta; replay reescreve)
     trades_csv_path = "trades_log.csv"
     save_trades_csv(
         trades_csv_path,
-        trades,
+        closed,
         dates,
-        initial_cash,
-        final_equity,
+        state["closed_equity"],
+        None,
+        append=replay_reason is None,
     )
+    for tr in closed:
+        state["closed_equity"] += tr["pnl"]  # mesma ordem de soma do CSV
+
+    state["last_t"] = T - 1
+    state["last_date"] = dates[-1].strftime("%Y-%m-%d")
+    state["last_prices"] = [float(Px[-1]), float(Py[-1])]
+    save_bot_state(state)
+
+    # 5) Resumo
+    cash = strategy["cash"]
+    position = strategy["position"]
+    equity = cash + position * Py[-1]
+
+    print("\n=== RESUMO DO PAPER TRADING ATÉ HOJE ===")
+    print(f"Data de hoje (aprox.): {datetime.now().date()}")
+    print(f"Último pregão processado: {state['last_date']} ({T - t_start} candle(s) novo(s))")
+    print(f"Capital inicial: 1000.00")
+    print(f"Caixa: {cash:.2f} | Posição: {position:.6f}")
+    print(f"Equity (marcada a mercado): {equity:.2f}")
+    print(f"Retorno total (%): {(equity / 1000.0 - 1.0) * 100.0:.2f}%")
+    print(f"Trades fechadas nesta execução: {len(closed)}")
+
+    if strategy["trades"]:
+        tr = strategy["trades"][-1]
+        print({
+            "open_since": dates[tr["entry_t"]].strftime("%Y-%m-%d"),
+            "entry_price": tr["entry_price"],
+            "size": tr["size"],
+            "ret_now_pct": (Py[-1] / tr["entry_price"] - 1.0) * 100.0,
+        })
+    elif strategy["planned_entry_t"] is not None:
+        ahead = strategy["planned_entry_t"] - (T - 1)
+        print(f"Entrada planejada daqui a {ahead} pregão(ões).")
+
+    # Mostra últimas 3 trades fechadas
+    print("\nÚltimas trades fechadas nesta execução (até 3):")
+    for tr in closed[-3:]:
+        print({
+            "entry_date": dates[tr["entry_t"]].strftime("%Y-%m-%d"),
+            "exit_date": dates[tr["exit_t"]].strftime("%Y-%m-%d"),
+            "entry_price": tr["entry_price"],
+            "exit_price": tr["exit_price"],
+            "pnl": tr["pnl"],
+            "exit_reason": tr["exit_reason"],
+        })
 
-    print(f"\n[INFO] Trades salvas em {trades_csv_path}.")
-    print("      Cada execução sobrescreve o arquivo com o histórico completo até o dia atual.")
-    print("      Use isso para analisar PnL por trade, equity por trade, etc.")
+    print(f"\n[INFO] Estado salvo em {STATE_PATH}; trades em {trades_csv_path}.")
 
 
 if __name__ == "__main__":
@@ -19,63 +19,26 @@ from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
+
+from data.price_cache import load_close_series
 
 
 # ----------------- Helpers de preço ----------------- #
 
-def load_price_series(ticker: str, period: str = "180d", interval: str = "1d") -> pd.Series:
+def load_price_series(ticker: str, period: str = "180d", interval: str = "1d", offline=None) -> pd.Series:
     """
-    Baixa uma série de preços (Close ou Adj Close) de um ticker.
-    Já trata o MultiIndex Price x Ticker que o yfinance está retornando pra você.
+    Série de preços (Close ou Adj Close) de um ticker, servida pelo cache
+    local de preços (só baixa do Yahoo os candles que faltam).
+    offline=True usa só o cache, sem rede.
     """
-    df = yf.download(
+    series = load_close_series(
         ticker,
         period=period,
         interval=interval,
         auto_adjust=False,
-        progress=False,
+        offline=offline,
     )
 
-    if df is None or df.empty:
-        raise RuntimeError(f"ERRO: yfinance retornou DataFrame vazio para {ticker}.")
-
-    cols = df.columns
-
-    if isinstance(cols, pd.MultiIndex):
-        level0 = cols.get_level_values(0)
-        series = None
-
-        if "Close" in level0:
-            close_df = df["Close"]
-            if isinstance(close_df, pd.DataFrame):
-                series = close_df.iloc[:, 0]
-            else:
-                series = close_df
-        elif "Adj Close" in level0:
-            adj_df = df["Adj Close"]
-            if isinstance(adj_df, pd.DataFrame):
-                series = adj_df.iloc[:, 0]
-            else:
-                series = adj_df
-
-        if series is None:
-            raise RuntimeError(
-                f"ERRO: Nenhuma coluna 'Close' ou 'Adj Close' encontrada em MultiIndex para {ticker}.\n"
-                f"Colunas: {cols}"
-            )
-    else:
-        if "Close" in cols:
-            series = df["Close"]
-        elif "Adj Close" in cols:
-            series = df["Adj Close"]
-        else:
-            raise RuntimeError(
-                f"ERRO: Nenhuma coluna 'Close' ou 'Adj Close' encontrada para {ticker}.\n"
-                f"Colunas: {list(cols)}"
-            )
-
-    series = series.dropna()
     if series.empty:
         raise RuntimeError(f"ERRO: Série de preços vazia para {ticker} após dropna.")
 
@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+from core.leadlag import backtest_lead_lag, backtest_lead_lag_batch, backtest_lead_lag_events
+from core.market import PreparedMarketData
+from evolution.checkpoint import save_ga_checkpoint
+from evolution.ga import _evaluate_metrics_only, evaluate_genome, new_ga_state, race_report, run_ga, step_ga
+from evolution.genome import array_to_genomes, random_population
+from evolution.parallel import evaluate_many, make_evaluation_pool
+from evolution.steady_state import run_steady_state_ga
+
+T = 1500
+FEE = 0.0005
+
+
+@pytest.fixture(scope="module")
+def prices():
+    # Y segue X com 2 candles de atraso, para as estratégias terem trades
+    rng = np.random.default_rng(5)
+    rx = rng.normal(0, 0.02, T)
+    ry = 0.4 * np.roll(rx, 2) + rng.normal(0, 0.015, T)
+    return 30 * np.exp(np.cumsum(rx)), 60 * np.exp(np.cumsum(ry))
+
+
+@pytest.fixture(scope="module")
+def market(prices):
+    return PreparedMarketData(*prices)
+
+
+@pytest.fixture(scope="module")
+def genomes():
+    gs = array_to_genomes(random_population(30, np.random.default_rng(1)))
+    # casos de borda: entrada no mesmo candle do sinal e threshold >= 0
+    gs[0]["lag"] = 0
+    gs[1]["threshold"] = 0.001
+    gs[2]["lag"] = 0
+    gs[2]["threshold"] = 0.0
+    return gs
+
+
+def _params(g):
+    return {k: g[k] for k in ("threshold", "lag", "tp", "sl", "max_hold")}
+
+
+def _without_result(evaluation):
+    return {k: v for k, v in evaluation.items() if k != "result"}
+
+
+def test_batch_matches_scalar(prices, genomes):
+    Px, Py = prices
+    batch = backtest_lead_lag_batch(
+        Px, Py,
+        thresholds=[g["threshold"] for g in genomes],
+        tps=[g["tp"] for g in genomes],
+        sls=[g["sl"] for g in genomes],
+        lags=[g["lag"] for g in genomes],
+        max_holds=[g["max_hold"] for g in genomes],
+        fee=FEE,
+    )
+    for i, g in enumerate(genomes):
+        ref = backtest_lead_lag(Px, Py, fee=FEE, **_params(g))
+        assert batch["final_equity"][i] == ref["final_equity"]
+        assert batch["n_trades"][i] == len(ref["trades"])
+        assert np.array_equal(batch["equity_curves"][i], ref["equity_curve"])
+
+
+@pytest.mark.parametrize("start, stop", [(0, T), (1, 50), (400, 1100), (T - 10, T), (T - 1, T), (700, 700)])
+def test_events_matches_scalar(prices, market, genomes, start, stop):
+    Px, Py = prices
+    for g in genomes:
+        ref = backtest_lead_lag(Px[start:stop], Py[start:stop], fee=FEE, **_params(g))
+        res = backtest_lead_lag_events(
+            None, None, fee=FEE, market=market.window(start, stop), return_equity=True, **_params(g)
+        )
+        assert res["trades"] == ref["trades"]
+        assert res["final_equity"] == ref["final_equity"]
+        assert np.array_equal(res["equity_curve"], ref["equity_curve"])
+
+
+def test_metrics_only_matches_full_evaluation(prices, market, genomes):
+    Px, Py = prices
+    for g in genomes:
+        ref = _without_result(evaluate_genome(g, Px, Py, fee=FEE))
+        for res in (
+            _without_result(evaluate_genome(g, None, None, fee=FEE, market=market)),
+            evaluate_genome(g, None, None, fee=FEE, market=market, full=False),
+        ):
+            # Sortino vem de momentos agregados: igual só até o arredondamento
+            assert res.pop("sortino") == pytest.approx(ref["sortino"], rel=1e-12, abs=1e-15)
+            assert res == {k: v for k, v in ref.items() if k != "sortino"}
+
+
+def test_resumed_metrics_only_matches_full(market, genomes):
+    # o racing retoma cada filho do snapshot do prefixo anterior
+    for g in genomes:
+        for short, long in [(300, 800), (800, T), (T - 5, T)]:
+            _, snap = _evaluate_metrics_only(g, market.window(0, short), FEE, snapshot=True)
+            ref = _evaluate_metrics_only(g, market.window(0, long), FEE)
+            assert _evaluate_metrics_only(g, market.window(0, long), FEE, resume=snap) == ref
+
+
+def test_shared_memory_pool_matches_serial(market, genomes):
+    window = market.window(200, 1300)
+    ref = [evaluate_genome(g, None, None, fee=FEE, market=window, full=False) for g in genomes]
+    with make_evaluation_pool(market, 2) as executor:
+        assert evaluate_many(genomes, window, FEE, executor) == ref
+
+
+@pytest.mark.parametrize("options", [{}, {"race_rungs": (0.25, 0.5), "surrogate_pool": 3}])
+def test_ga_independent_of_worker_count(market, options):
+    kwargs = dict(population_size=16, generations=4, seed=7, market=market, **options)
+    best, history = run_ga(None, None, **kwargs)
+    for n_workers in (2, 3):
+        best_p, history_p = run_ga(None, None, n_workers=n_workers, **kwargs)
+        assert best_p["genome"] == best["genome"]
+        assert best_p["fitness"] == best["fitness"]
+        assert history_p == history
+
+
+def test_racing_default_costs_at_most_no_racing_budget(market):
+    kwargs = dict(population_size=16, generations=4, seed=7, market=market, race_rungs=(0.25, 0.5))
+    _, _, state = run_ga(None, None, return_state=True, **kwargs)
+    stats = state["race_stats"]
+    assert stats["budget"] == 4 * (16 - int(16 * 0.2))
+    assert 0 < stats["cost"] <= stats["budget"]
+    assert "(-" not in race_report(stats)
+
+    # repor as vagas com mais candidatos custa mais que sem corrida
+    _, _, state = run_ga(None, None, return_state=True, race_fill="candidates", **kwargs)
+    assert state["race_stats"]["cost"] > state["race_stats"]["budget"]
+    assert "(-" in race_report(state["race_stats"])
+
+
+def test_ga_checkpoint_resume_matches_uninterrupted(market, tmp_path):
+    kwargs = dict(population_size=16, generations=6, seed=7)
+    best, history = run_ga(None, None, market=market, **kwargs)
+
+    # execução interrompida na 3ª geração
+    state = new_ga_state(market, **kwargs)
+    step_ga(state, market, 3, verbose=False)
+    path = str(tmp_path / "ga.npz")
+    save_ga_checkpoint(state, path, market.fingerprint)
+
+    best_r, history_r = run_ga(None, None, market=market, checkpoint_path=path, **kwargs)
+    assert best_r["genome"] == best["genome"]
+    assert best_r["fitness"] == best["fitness"]
+    assert history_r == history
+
+
+def test_ga_checkpoint_rejects_other_initial_population(market, tmp_path, capsys):
+    kwargs = dict(population_size=16, generations=4, seed=7)
+    seeds = random_population(4, np.random.default_rng(3))
+    state = new_ga_state(market, initial_population=seeds, **kwargs)
+    step_ga(state, market, 2, verbose=False)
+    path = str(tmp_path / "ga.npz")
+    save_ga_checkpoint(state, path, market.fingerprint)
+
+    other = seeds.copy()
+    other[0, 0] += 0.001
+    for initial_population in (None, other):
+        best, history = run_ga(None, None, market=market, initial_population=initial_population, **kwargs)
+        save_ga_checkpoint(state, path, market.fingerprint)
+        capsys.readouterr()
+        best_r, history_r = run_ga(
+            None, None, market=market, initial_population=initial_population, checkpoint_path=path, **kwargs
+        )
+        assert "outra configuração" in capsys.readouterr().out
+        assert best_r["fitness"] == best["fitness"]
+        assert history_r == history
+
+    save_ga_checkpoint(state, path, market.fingerprint)
+    run_ga(None, None, market=market, initial_population=seeds, checkpoint_path=path, **kwargs)
+    assert "Retomando" in capsys.readouterr().out
+
+
+def test_steady_state_reproducible_independent_of_worker_count(market):
+    kwargs = dict(population_size=12, max_evaluations=60, seed=7, market=market, reproducible=True)
+    best, history = run_steady_state_ga(None, None, **kwargs)
+    for n_workers in (2, 3):
+        best_p, history_p = run_steady_state_ga(None, None, n_workers=n_workers, **kwargs)
+        assert best_p["genome"] == best["genome"]
+        assert history_p == history
@@ -0,0 +1,69 @@
+import numpy as np
+
+from core.ledger import TradeLedger
+from core.leadlag import backtest_lead_lag, backtest_lead_lag_events
+from core.market import PreparedMarketData
+
+FEE = 0.002
+PARAMS = dict(threshold=-0.01, lag=1, tp=0.02, sl=-0.01, max_hold=10, fee=FEE)
+
+# X cai em t=1 e t=7; Y sobe 3% em t=5 (TP) e a 2ª trade fecha no fim dos dados
+PX = np.array([100.0, 98.0, 98.0, 98.0, 98.0, 98.0, 98.0, 97.0, 97.0, 97.0])
+PY = np.array([10.0, 10.0, 10.0, 10.0, 10.0, 10.3, 10.0, 10.0, 10.0, 10.0])
+
+
+def _old_trades():
+    """Lista de dicts como o backtest_lead_lag devolvia antes do TradeLedger (mesmas contas)."""
+    trades, cash = [], 1000.0
+    for signal_t, entry_t, exit_t, reason in [(2, 3, 5, "TP"), (8, 9, 9, "EOD")]:
+        entry_price, exit_price = PY[entry_t].item(), PY[exit_t].item()
+        size = cash / (entry_price * (1.0 + FEE))
+        cost = size * entry_price
+        fee_entry = cost * FEE
+        cash -= cost + fee_entry
+        revenue = size * exit_price
+        fee_exit = revenue * FEE
+        cash += revenue - fee_exit
+        trades.append({
+            "signal_t": signal_t,
+            "entry_t": entry_t,
+            "entry_price": entry_price,
+            "size": size,
+            "fee_entry": fee_entry,
+            "exit_t": exit_t,
+            "exit_price": exit_price,
+            "fee_exit": fee_exit,
+            "pnl": (exit_price - entry_price) * size - (fee_entry + fee_exit),
+            "exit_reason": reason,
+        })
+    return trades
+
+
+def test_ledger_behaves_like_old_list_of_dicts():
+    old = _old_trades()
+    for res in (
+        backtest_lead_lag(PX, PY, **PARAMS),
+        backtest_lead_lag_events(None, None, market=PreparedMarketData(PX, PY), **PARAMS),
+    ):
+        trades = res["trades"]
+        assert isinstance(trades, TradeLedger)
+        assert len(trades) == len(old)
+        assert trades[-1]["pnl"] == old[-1]["pnl"] < 0  # só as taxas
+        assert trades[-1]["exit_reason"] == "EOD"
+        assert [dict(tr) for tr in trades] == old
+        assert [tr["exit_reason"] for tr in trades] == ["TP", "EOD"]
+        assert trades == old
+        assert trades.to_dicts() == old
+        assert TradeLedger.from_dicts(old) == trades
+
+
+def test_open_trade_has_no_exit_fields():
+    ledger = TradeLedger(capacity=1)
+    ledger.open(2, 3, 10.0, 99.0, 0.99)
+    assert "pnl" not in ledger[-1]
+    assert ledger[-1].get("exit_t") is None
+    ledger.close(5, 10.3, 1.02, 27.7, "TP")
+    ledger.open(8, 9, 10.0, 102.0, 1.02)  # cresce além da capacidade
+    assert len(ledger) == 2
+    assert ledger[0]["exit_reason"] == "TP"
+    assert list(ledger.exit_reasons()) == ["TP", ""]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from evolution.nsga2 import OBJECTIVES, crowding_distance, non_dominated_sort, objective_matrix
+
+# (total_return_pct, mdd_pct, trade_penalty)
+POINTS = {
+    "A": (50.0, -10.0, 0.0),
+    "B": (30.0, -5.0, 0.0),
+    "C": (40.0, -20.0, 0.0),   # dominado por A
+    "D": (60.0, -30.0, 5.0),
+    "E": (50.0, -10.0, 2.0),   # igual a A, mas com mais penalidade de trades
+    "F": (20.0, -25.0, 3.0),   # dominado por C e E
+    "H": (55.0, -20.0, 1.0),
+}
+NAMES = list(POINTS)
+
+
+def _evals():
+    keys = [key for key, _ in OBJECTIVES]
+    return [dict(zip(keys, values)) for values in POINTS.values()]
+
+
+def test_objective_matrix_flips_maximized_objectives():
+    F = objective_matrix(_evals())
+    assert F[NAMES.index("A")].tolist() == [-50.0, 10.0, 0.0]
+    assert F[NAMES.index("D")].tolist() == [-60.0, 30.0, 5.0]
+
+
+def test_non_dominated_sort_fronts():
+    rank = non_dominated_sort(objective_matrix(_evals()))
+    assert dict(zip(NAMES, rank.tolist())) == {"A": 0, "B": 0, "D": 0, "H": 0, "C": 1, "E": 1, "F": 2}
+
+    # sem a penalidade de trades, E empata com A e volta para a frente
+    rank = non_dominated_sort(objective_matrix(_evals(), OBJECTIVES[:2]))
+    assert rank[NAMES.index("E")] == 0
+
+
+def test_crowding_distance_boundaries_are_infinite():
+    F = objective_matrix(_evals())
+    dist = dict(zip(NAMES, crowding_distance(F, non_dominated_sort(F)).tolist()))
+
+    # frente 0: B/D extremos de retorno e drawdown, A/D de penalidade
+    for name in ("A", "B", "D"):
+        assert dist[name] == np.inf
+    # H: (60-50)/30 + (30-10)/25 + (5-0)/5
+    assert dist["H"] == pytest.approx(1 / 3 + 0.8 + 1.0)
+    # frentes com até 2 pontos ficam inteiras com inf
+    for name in ("C", "E", "F"):
+        assert dist[name] == np.inf
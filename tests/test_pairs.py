@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from core.pairs import lagged_cross_correlation
+
+T = 500
+MAX_LAG = 3
+
+
+@pytest.fixture(scope="module")
+def returns():
+    # 1 segue 0 com 2 candles de atraso; 2 é ruído independente
+    rng = np.random.default_rng(0)
+    x = rng.normal(0, 0.02, T)
+    return np.column_stack([x, 0.8 * np.roll(x, 2) + rng.normal(0, 0.01, T), rng.normal(0, 0.02, T)])
+
+
+def test_lagged_cross_correlation_matches_corrcoef(returns):
+    C = lagged_cross_correlation(returns, max_lag=MAX_LAG)
+    N = returns.shape[1]
+    for L in range(MAX_LAG + 1):
+        # C[L, i, j] = corr(r_i[t - L], r_j[t])
+        ref = np.corrcoef(returns[:T - L].T, returns[L:].T)[:N, N:]
+        # a FFT padroniza com média/desvio da amostra inteira, não só da sobreposição
+        atol = 1e-12 if L == 0 else 5e-3
+        assert np.allclose(C[L], ref, rtol=0, atol=atol)
+
+    assert np.argmax(C[:, 0, 1]) == 2
+
+
+def test_lagged_cross_correlation_independent_of_chunk_size(returns):
+    ref = lagged_cross_correlation(returns, max_lag=MAX_LAG)
+    assert np.allclose(lagged_cross_correlation(returns, max_lag=MAX_LAG, chunk_bytes=1), ref, rtol=0, atol=1e-15)
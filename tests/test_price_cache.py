@@ -0,0 +1,108 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.price_cache import cache_path, load_close_many, read_cache
+
+START = "2020-01-01"
+DATES = pd.bdate_range(START, periods=30)
+
+
+class FakeYahoo:
+    """yf.download com o histórico em memória; guarda cada chamada."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def download(self, tickers, period=None, start=None, interval=None, auto_adjust=None, progress=None):
+        self.calls.append({"tickers": list(tickers), "period": period, "start": start})
+        columns = {}
+        for t in tickers:
+            s = self.prices[t]
+            columns[("Close", t)] = s if start is None else s[s.index >= pd.Timestamp(start)]
+        return pd.DataFrame(columns)
+
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    monkeypatch.delenv("PRICE_CACHE_OFFLINE", raising=False)
+    fake = FakeYahoo({})
+    monkeypatch.setitem(sys.modules, "yfinance", fake)
+    return fake
+
+
+def _history(n, scale=1.0):
+    return pd.Series(scale * (100.0 + np.arange(n)), index=DATES[:n], name="Close")
+
+
+def _assert_prices(series, expected):
+    assert list(series.index) == list(expected.index)
+    assert np.array_equal(series.to_numpy(), expected.to_numpy())
+
+
+def _load(tmp_path, tickers=("AAA",), **kwargs):
+    return load_close_many(list(tickers), start=START, cache_dir=str(tmp_path), **kwargs)
+
+
+def test_incremental_update_fetches_only_the_tail(yahoo, tmp_path):
+    yahoo.prices = {"AAA": _history(20)}
+    _load(tmp_path)
+
+    yahoo.prices = {"AAA": _history(30)}
+    out = _load(tmp_path)
+
+    assert len(yahoo.calls) == 2
+    assert yahoo.calls[1]["start"] == DATES[18]  # penúltimo candle salvo
+    _assert_prices(out["AAA"], _history(30))
+    cached, _ = read_cache(cache_path("AAA", cache_dir=str(tmp_path)))
+    _assert_prices(cached, _history(30))
+
+
+def test_adjustment_change_at_seam_refetches_history(yahoo, tmp_path, capsys):
+    yahoo.prices = {"AAA": _history(20), "BBB": _history(20)}
+    _load(tmp_path, ("AAA", "BBB"))
+
+    # dividendo em AAA: o Yahoo reajusta o histórico inteiro
+    yahoo.prices = {"AAA": _history(30, scale=0.98), "BBB": _history(30)}
+    out = _load(tmp_path, ("AAA", "BBB"))
+
+    assert len(yahoo.calls) == 3
+    assert yahoo.calls[2]["tickers"] == ["AAA"]
+    assert yahoo.calls[2]["start"] == pd.Timestamp(START)
+    assert "rebaixando o histórico" in capsys.readouterr().out
+    _assert_prices(out["AAA"], _history(30, scale=0.98))
+    _assert_prices(out["BBB"], _history(30))
+
+
+@pytest.mark.parametrize("use_env", [False, True])
+def test_offline_never_calls_the_network(yahoo, tmp_path, monkeypatch, use_env):
+    yahoo.prices = {"AAA": _history(20)}
+    _load(tmp_path)
+    yahoo.prices = {"AAA": _history(30)}
+    yahoo.calls.clear()
+
+    if use_env:
+        monkeypatch.setenv("PRICE_CACHE_OFFLINE", "1")
+        offline = None
+    else:
+        offline = True
+    out = _load(tmp_path, offline=offline)
+    _assert_prices(out["AAA"], _history(20))
+
+    with pytest.raises(RuntimeError, match="offline"):
+        _load(tmp_path, ("AAA", "ZZZ"), offline=offline)
+    assert yahoo.calls == []
+
+
+def test_single_bar_cache_is_extended(yahoo, tmp_path):
+    yahoo.prices = {"AAA": _history(1)}
+    _load(tmp_path)
+
+    yahoo.prices = {"AAA": _history(5)}
+    out = _load(tmp_path)
+
+    assert yahoo.calls[1]["start"] == DATES[0]
+    _assert_prices(out["AAA"], _history(5))